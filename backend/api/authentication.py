@@ -0,0 +1,74 @@
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, router
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import TwoLevelCache
+
+
+class TokenCache(TwoLevelCache):
+    """
+    Поля пользователя без пароля по ключам токенов. Запись в памяти
+    воркера живет TOKEN_CACHE_LOCAL_TIMEOUT секунд: выход или блокировка
+    в другом воркере становятся видны здесь не позже этого срока.
+    """
+
+    def get_key(self, token_key):
+        digest = hashlib.sha256(token_key.encode()).hexdigest()
+        return f'{self.prefix}:{digest}'
+
+
+token_cache = TokenCache(
+    'token_auth', 'TOKEN_CACHE_TIMEOUT', 'TOKEN_CACHE_LOCAL_SIZE',
+    'TOKEN_CACHE_LOCAL_TIMEOUT',
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса к базе для уже известных токенов.
+    В кэше все поля пользователя, кроме хэша пароля: он загружается
+    из базы только при обращении к нему.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache.get_key(key)
+        cached = token_cache.get(cache_key)
+        if cached is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            token_cache.set(cache_key, {
+                field: getattr(token.user, field)
+                for field in self.cached_fields()
+            })
+            self.check_active(token.user.is_active)
+            return token.user, token
+        self.check_active(cached['is_active'])
+        user_model = get_user_model()
+        fields = self.cached_fields()
+        user = user_model.from_db(
+            router.db_for_read(user_model) or DEFAULT_DB_ALIAS, fields,
+            [cached[field] for field in fields],
+        )
+        return user, self.get_model()(key=key, user=user)
+
+    @staticmethod
+    def cached_fields():
+        """Поля пользователя для кэша в порядке полей модели."""
+        return [
+            field.attname for field in get_user_model()._meta.concrete_fields
+            if field.attname != 'password'
+        ]
+
+    @staticmethod
+    def check_active(is_active):
+        if not is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+TAG_CATALOG_VERSION = 'tag_catalog_version'
+INGREDIENT_CATALOG_VERSION = 'ingredient_catalog_version'
+RECIPE_FEED_VERSION = 'recipe_feed_version'
+STATS_KEY = '{}_cache_stats:{}'
+STATS_FIELDS = ('local_hits', 'shared_hits', 'misses')
+
+
+def new_version():
+    """
+    Начальная версия для отсутствующего ключа. Ключ версии может быть
+    вытеснен из кэша, и счет с единицы вернул бы версию, под которой
+    еще лежат устаревшие данные, поэтому берется текущее время.
+    Микросекунды, а не наносекунды: django-redis увеличивает значение
+    скриптом Lua, где числа точны только до 2 ** 53.
+    """
+    return time.time_ns() // 1000
+
+
+def get_version(key):
+    """Возвращает текущую версию данных, хранящуюся в кэше."""
+    version = cache.get(key)
+    if version is None:
+        version = new_version()
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def get_versions(*keys):
+    """Версии нескольких наборов данных за одно обращение к кэшу."""
+    versions = cache.get_many(keys)
+    return [
+        versions[key] if key in versions else get_version(key)
+        for key in keys
+    ]
+
+
+def bump_version(key):
+    """Увеличивает версию данных, делая устаревшими все копии в воркерах."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = new_version()
+        cache.set(key, version, None)
+        return version
+
+
+class TwoLevelCache:
+    """
+    Общий кэш Django с ограниченным LRU в памяти воркера перед ним.
+    Сроки и размер берутся из настроек с переданными именами; срок в
+    памяти воркера по умолчанию совпадает с общим. Счетчики попаданий
+    копятся в воркере и пачками сбрасываются в общий кэш.
+    """
+
+    def __init__(self, prefix, timeout_setting, local_size_setting,
+                 local_timeout_setting=None):
+        self.prefix = prefix
+        self.timeout_setting = timeout_setting
+        self.local_size_setting = local_size_setting
+        self.local_timeout_setting = local_timeout_setting or timeout_setting
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    @property
+    def timeout(self):
+        return getattr(settings, self.timeout_setting)
+
+    @property
+    def local_timeout(self):
+        return getattr(settings, self.local_timeout_setting)
+
+    @property
+    def local_size(self):
+        return getattr(settings, self.local_size_setting)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.local.get(key)
+            if entry is not None and entry[0] > now:
+                self.local.move_to_end(key)
+                self.count('local_hits')
+                return entry[1]
+        value = cache.get(key)
+        with self.lock:
+            self.count('shared_hits' if value is not None else 'misses')
+            if value is not None:
+                self.remember(key, value, now)
+        return value
+
+    def set(self, key, value):
+        cache.set(key, value, self.timeout)
+        with self.lock:
+            self.remember(key, value, time.monotonic())
+
+    def delete(self, key):
+        cache.delete(key)
+        with self.lock:
+            self.local.pop(key, None)
+
+    def remember(self, key, value, now):
+        self.local[key] = (now + self.local_timeout, value)
+        self.local.move_to_end(key)
+        while len(self.local) > self.local_size:
+            self.local.popitem(last=False)
+
+    def count(self, field):
+        self.stats[field] += 1
+        if sum(self.stats.values()) >= settings.CACHE_STATS_FLUSH:
+            self.flush_stats()
+
+    def flush_stats(self):
+        for field, value in self.stats.items():
+            key = STATS_KEY.format(self.prefix, field)
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                if not cache.add(key, value, None):
+                    cache.incr(key, value)
+        self.stats.clear()
+
+    def get_stats(self):
+        with self.lock:
+            self.flush_stats()
+        stats = {
+            field: cache.get(STATS_KEY.format(self.prefix, field), 0)
+            for field in STATS_FIELDS
+        }
+        total = sum(stats.values())
+        stats['hit_ratio'] = round(
+            (stats['local_hits'] + stats['shared_hits']) / total, 4
+        ) if total else None
+        stats['local_size'] = len(self.local)
+        stats['timeout'] = self.timeout
+        return stats
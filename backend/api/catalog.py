@@ -0,0 +1,79 @@
+import gzip
+import hashlib
+from threading import Lock
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from .cache import get_version
+
+
+class CatalogSnapshot:
+    """
+    Готовый к отдаче JSON справочника (теги, ингредиенты).
+    Тело ответа сериализуется и сжимается один раз на версию справочника,
+    ETag считается по содержимому. Запрос с совпадающим If-None-Match
+    получает 304 без обращения к базе данных.
+    """
+
+    def __init__(self, version_key, queryset, serializer_class):
+        self.version_key = version_key
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+        self._lock = Lock()
+        self._version = None
+        self.body = b''
+        self.gzipped_body = b''
+        self.etag = ''
+
+    def _build(self):
+        # Снимок живет до следующей версии, реплика могла бы отстать.
+        data = self.serializer_class(
+            self.queryset.using(DEFAULT_DB_ALIAS), many=True
+        ).data
+        self.body = JSONRenderer().render(data)
+        self.gzipped_body = gzip.compress(self.body, mtime=0)
+        self.etag = '"{}"'.format(hashlib.sha256(self.body).hexdigest())
+
+    def _ensure_fresh(self):
+        version = get_version(self.version_key)
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._build()
+                self._version = version
+
+    def _set_cache_headers(self, response):
+        response['ETag'] = self.etag
+        response['Cache-Control'] = (
+            f'public, max-age={settings.CATALOG_CACHE_MAX_AGE}, '
+            'must-revalidate'
+        )
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+    def response(self, request):
+        self._ensure_fresh()
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = [
+                etag[2:] if etag.startswith('W/') else etag
+                for etag in parse_etags(if_none_match)
+            ]
+            if '*' in etags or self.etag in etags:
+                return self._set_cache_headers(HttpResponse(status=304))
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if 'gzip' in accept_encoding:
+            response = HttpResponse(
+                self.gzipped_body, content_type='application/json'
+            )
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(
+                self.body, content_type='application/json'
+            )
+        return self._set_cache_headers(response)
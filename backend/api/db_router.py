@@ -0,0 +1,95 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_COOKIE = 'db_primary'
+PIN_KEY = 'db_primary:{}'
+
+read_database = ContextVar('read_database', default=None)
+
+
+class ReplicaRouter:
+    """
+    Чтение идет в базу, выбранную ReplicaMiddleware для текущего
+    запроса, запись и миграции - всегда в основную.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        # Иначе объект, прочитанный из реплики, сохранялся бы в нее же.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def primary_reads():
+    """
+    Чтение из основной базы, пока заполняется общий кэш: отстающая
+    реплика иначе попала бы в кэш под новой версией данных.
+    """
+    token = read_database.set(None)
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+def get_pin_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return PIN_KEY.format(
+        hashlib.sha256(authorization.encode()).hexdigest()
+    )
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """
+    Безопасные запросы к API читают из случайной реплики. После записи
+    клиент на REPLICA_STICKY_SECONDS закрепляется за основной базой:
+    браузер по cookie, клиент с токеном по ключу в общем кэше, чтобы
+    сразу видеть свои изменения несмотря на отставание реплик.
+    """
+
+    def process_request(self, request):
+        read_database.set(None)
+        if (
+            not settings.REPLICA_DATABASES
+            or request.method not in SAFE_METHODS
+            or not request.path_info.startswith('/api/')
+            or PIN_COOKIE in request.COOKIES
+        ):
+            return
+        key = get_pin_key(request)
+        if key and cache.get(key):
+            return
+        read_database.set(random.choice(settings.REPLICA_DATABASES))
+
+    def process_response(self, request, response):
+        # Под ASGI шаги middleware идут в копиях контекста, поэтому
+        # значение сбрасывается, а не откатывается по токену.
+        read_database.set(None)
+        if request.method not in SAFE_METHODS and settings.REPLICA_DATABASES:
+            seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=seconds, httponly=True,
+                samesite='Lax',
+            )
+            key = get_pin_key(request)
+            if key:
+                cache.set(key, True, seconds)
+        return response
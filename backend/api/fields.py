@@ -0,0 +1,97 @@
+import base64
+import binascii
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from PIL import Image
+from rest_framework import serializers
+
+CHUNK_SIZE = 64 * 1024
+BASE64_HEADER = ';base64,'
+HEADER_MAX_LENGTH = 256
+IMAGE_EXTENSIONS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+
+
+class StreamingBase64ImageField(serializers.ImageField):
+    """
+    Изображение в base64 или файлом из multipart-запроса.
+    Base64 декодируется частями во временный файл, размер в байтах
+    проверяется до декодирования, а размер в пикселях - по заголовку
+    изображения до его полной загрузки. Временный файл закрывает
+    сериализатор после сохранения.
+    """
+
+    default_error_messages = {
+        'invalid_base64': 'Некорректные данные изображения.',
+        'too_large': 'Размер изображения больше {max_bytes} байт.',
+        'too_many_pixels': 'Изображение больше {max_pixels} пикселей.',
+        'unknown_format': 'Неподдерживаемый формат изображения.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            if data.size > settings.RECIPE_IMAGE_MAX_BYTES:
+                self.fail('too_large',
+                          max_bytes=settings.RECIPE_IMAGE_MAX_BYTES)
+            self.check_image(data)
+            return super().to_internal_value(data)
+        if not isinstance(data, str):
+            self.fail('invalid_base64')
+        header = data.find(BASE64_HEADER, 0, HEADER_MAX_LENGTH)
+        offset = header + len(BASE64_HEADER) if header != -1 else 0
+        if (len(data) - offset) * 3 // 4 > settings.RECIPE_IMAGE_MAX_BYTES:
+            self.fail('too_large', max_bytes=settings.RECIPE_IMAGE_MAX_BYTES)
+        uploaded = self.decode(data, offset)
+        try:
+            extension = self.check_image(uploaded)
+        except serializers.ValidationError:
+            uploaded.close()
+            raise
+        uploaded.name = f'{uuid.uuid4()}.{extension}'
+        return super().to_internal_value(uploaded)
+
+    def decode(self, data, offset):
+        """Декодирует base64 частями, не копируя строку целиком."""
+        uploaded = TemporaryUploadedFile(
+            'image', 'application/octet-stream', 0, None
+        )
+        tail = ''
+        try:
+            for start in range(offset, len(data), CHUNK_SIZE):
+                chunk = tail + ''.join(
+                    data[start:start + CHUNK_SIZE].split()
+                )
+                usable = len(chunk) - len(chunk) % 4
+                uploaded.write(base64.b64decode(chunk[:usable], validate=True))
+                tail = chunk[usable:]
+            if tail:
+                raise binascii.Error
+        except (binascii.Error, ValueError):
+            uploaded.close()
+            self.fail('invalid_base64')
+        uploaded.size = uploaded.tell()
+        uploaded.seek(0)
+        return uploaded
+
+    def check_image(self, uploaded):
+        """Проверяет формат и размер в пикселях по заголовку файла."""
+        try:
+            with Image.open(uploaded) as image:
+                width, height = image.size
+                image_format = image.format
+        except (OSError, Image.DecompressionBombError):
+            self.fail('invalid_image')
+        finally:
+            uploaded.seek(0)
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            self.fail('too_many_pixels',
+                      max_pixels=settings.RECIPE_IMAGE_MAX_PIXELS)
+        if image_format not in IMAGE_EXTENSIONS:
+            self.fail('unknown_format')
+        return IMAGE_EXTENSIONS[image_format]
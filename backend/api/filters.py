@@ -2,6 +2,8 @@ from django_filters.rest_framework import FilterSet, filters
 from rest_framework.filters import SearchFilter
 
 from recipes.models import Recipe, Tag
+from recipes.search import search_recipes
+from users.models import User
 
 
 class IngredientSearchFilter(SearchFilter):
@@ -22,11 +24,21 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.CharFilter(
         field_name='is_in_shopping_cart', method='get_is_in_shopping_cart'
     )
-    author = filters.AllValuesMultipleFilter(field_name='author__id')
+    # AllValuesMultipleFilter строил варианты выбора запросом
+    # DISTINCT author_id по всем рецептам на каждый запрос ленты.
+    author = filters.ModelMultipleChoiceFilter(
+        field_name='author',
+        queryset=User.objects.all()
+    )
+    search = filters.CharFilter(method='get_search')
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
+        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'search']
+
+    def get_search(self, queryset, name, data):
+        return search_recipes(queryset, data)
 
     def get_is_favorited(self, queryset, name, data):
         if data and not self.request.user.is_anonymous:
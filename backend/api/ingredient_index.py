@@ -0,0 +1,92 @@
+from bisect import bisect_left, bisect_right
+from threading import Lock
+
+from django.db import DEFAULT_DB_ALIAS
+
+from recipes.models import Ingredient
+from .cache import INGREDIENT_CATALOG_VERSION, get_version
+
+SEPARATOR = '\n'
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти воркера для автодополнения.
+    Сначала возвращаются совпадения по началу названия (поиск бисекцией
+    по отсортированному списку), затем совпадения по подстроке.
+    Индекс строится при первом обращении и перестраивается, когда
+    меняется версия каталога в кэше.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._keys = []
+        self._rows = []
+        self._offsets = []
+        self._haystack = ''
+
+    def _build(self):
+        entries = sorted(
+            (name.casefold(), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.using(
+                DEFAULT_DB_ALIAS
+            ).values_list('id', 'name', 'measurement_unit')
+        )
+        self._keys = [entry[0] for entry in entries]
+        self._rows = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for _, pk, name, measurement_unit in entries
+        ]
+        self._offsets = []
+        offset = 0
+        for key in self._keys:
+            self._offsets.append(offset)
+            offset += len(key) + len(SEPARATOR)
+        self._haystack = SEPARATOR.join(self._keys)
+
+    def _ensure_fresh(self):
+        version = get_version(INGREDIENT_CATALOG_VERSION)
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._build()
+                self._version = version
+
+    def _prefix_range(self, query):
+        start = bisect_left(self._keys, query)
+        end = bisect_right(self._keys, query + '\U0010ffff', lo=start)
+        return start, end
+
+    def _substring_positions(self, query, prefix_range):
+        start, end = prefix_range
+        position = self._haystack.find(query)
+        while position != -1:
+            index = bisect_right(self._offsets, position) - 1
+            if not start <= index < end:
+                yield index
+            next_key = (
+                self._offsets[index + 1]
+                if index + 1 < len(self._offsets) else len(self._haystack)
+            )
+            position = self._haystack.find(query, next_key)
+
+    def search(self, query, limit=None):
+        """Ищет ингредиенты по началу названия, затем по подстроке."""
+        self._ensure_fresh()
+        query = query.strip().casefold()
+        if SEPARATOR in query:
+            return []
+        start, end = self._prefix_range(query)
+        result = self._rows[start:end]
+        if limit is not None and len(result) >= limit:
+            return result[:limit]
+        for index in self._substring_positions(query, (start, end)):
+            result.append(self._rows[index])
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,61 @@
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from recipes.models import Favorite, ShoppingList
+from .cache import bump_version, get_version
+
+MEMBERSHIP_VERSION_KEY = 'recipe_membership_version:{}'
+MEMBERSHIP_KEY = 'recipe_membership:{}'
+
+
+class RecipeMembership:
+    """
+    Множества id рецептов из избранного и списка покупок пользователя.
+    В кэше хранятся отсортированными массивами чисел под версией
+    пользователя, в памяти запроса - множествами для проверки за O(1).
+    """
+
+    def __init__(self, favorites, shopping_cart):
+        self.favorites = frozenset(favorites)
+        self.shopping_cart = frozenset(shopping_cart)
+
+    @staticmethod
+    def load_ids(model, user_id):
+        # Множества кэшируются до следующей версии, поэтому без реплики.
+        return array('L', sorted(
+            model.objects.using(DEFAULT_DB_ALIAS).filter(
+                user_id=user_id
+            ).values_list('recipe_id', flat=True)
+        ))
+
+    @classmethod
+    def for_user(cls, user_id):
+        version = get_version(MEMBERSHIP_VERSION_KEY.format(user_id))
+        key = MEMBERSHIP_KEY.format(user_id)
+        arrays = cache.get(key, version=version)
+        if arrays is None:
+            arrays = (
+                cls.load_ids(Favorite, user_id),
+                cls.load_ids(ShoppingList, user_id),
+            )
+            cache.set(
+                key, arrays, settings.MEMBERSHIP_CACHE_TIMEOUT,
+                version=version
+            )
+        return cls(*arrays)
+
+    @staticmethod
+    def invalidate(user_id):
+        bump_version(MEMBERSHIP_VERSION_KEY.format(user_id))
+
+
+def get_membership(request):
+    """Членство пользователя запроса, загружается один раз на запрос."""
+    membership = getattr(request, 'recipe_membership', None)
+    if membership is None:
+        membership = RecipeMembership.for_user(request.user.id)
+        request.recipe_membership = membership
+    return membership
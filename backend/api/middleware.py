@@ -0,0 +1,114 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryProfile:
+    """Обертка над выполнением SQL: считает запросы и время в базе."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated(self):
+        """Одинаковые запросы, выполненные подозрительно много раз."""
+        return [
+            (sql, count) for sql, count in self.statements.most_common()
+            if count >= settings.REPEATED_QUERY_THRESHOLD
+        ]
+
+
+class ProfilingMiddleware:
+    """
+    Замеряет запрос: число запросов к базе и время в SQL, в коде
+    представления и в рендеринге ответа. Результат отдается заголовком
+    Server-Timing, медленные запросы и повторяющиеся SQL (N+1) пишутся
+    в лог. Включается настройкой REQUEST_PROFILING, без нее Django
+    исключает middleware из цепочки при старте.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = QueryProfile()
+        request.query_profile = profile
+        request.view_finished = None
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(profile)
+                )
+            response = self.get_response(request)
+        finished = time.perf_counter()
+        timings = self.get_timings(request, started, finished)
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.1f}'
+            for name, duration in timings.items()
+        ) + f', queries;desc="{profile.count}"'
+        repeated = profile.repeated()
+        if timings['total'] * 1000 >= settings.SLOW_REQUEST_MS or repeated:
+            self.log(request, response, timings, repeated)
+        return response
+
+    def process_template_response(self, request, response):
+        """Вызывается до рендеринга: отмечает конец работы представления."""
+        request.view_finished = (
+            time.perf_counter(), request.query_profile.duration
+        )
+        return response
+
+    @staticmethod
+    def get_timings(request, started, finished):
+        profile = request.query_profile
+        view_finished, view_sql = request.view_finished or (
+            finished, profile.duration
+        )
+        # Вне SQL представления DRF почти все время сериализуют данные.
+        return {
+            'db': profile.duration,
+            'serialize': max(view_finished - started - view_sql, 0),
+            'render': max(
+                finished - view_finished - (profile.duration - view_sql), 0
+            ),
+            'total': finished - started,
+        }
+
+    @staticmethod
+    def log(request, response, timings, repeated):
+        profile = request.query_profile
+        logger.warning(json.dumps({
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'queries': profile.count,
+            **{
+                f'{name}_ms': round(duration * 1000, 1)
+                for name, duration in timings.items()
+            },
+            'repeated': [
+                {'count': count, 'sql': sql[:500]}
+                for sql, count in repeated
+            ],
+        }, ensure_ascii=False))
@@ -0,0 +1,104 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination
+)
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Пагинатор, который на больших выборках берет число строк из оценки
+    планировщика PostgreSQL вместо точного COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        if settings.PAGINATION_APPROXIMATE_COUNT:
+            estimate = self.estimate_count()
+            if (estimate is not None
+                    and estimate >= settings.APPROXIMATE_COUNT_THRESHOLD):
+                return estimate
+        return super().count
+
+    def estimate_count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class LimitPageNumberPagination(PageNumberPagination):
+    """Постраничная пагинация с размером страницы из параметра limit."""
+
+    django_paginator_class = ApproximateCountPaginator
+    page_size_query_param = 'limit'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Пагинация ленты рецептов по курсору, без COUNT(*) и OFFSET."""
+
+    ordering = ('-pub_date', 'id')
+    page_size_query_param = 'limit'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        if 'search_rank' in queryset.query.annotations:
+            return ('-search_rank',) + self.ordering
+        return super().get_ordering(request, queryset, view)
+
+
+class SubscriptionCursorPagination(RecipeCursorPagination):
+    """Пагинация подписок по курсору в порядке модели пользователя."""
+
+    ordering = ('-id',)
+
+
+class HybridPagination(BasePagination):
+    """
+    Включает пагинацию по курсору, если в запросе есть параметр cursor
+    (пустой для первой страницы), иначе оставляет постраничную.
+    """
+
+    page_number_class = LimitPageNumberPagination
+    cursor_class = RecipeCursorPagination
+
+    def __init__(self):
+        self.paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_class.cursor_query_param in request.query_params:
+            self.paginator = self.cursor_class()
+        else:
+            self.paginator = self.page_number_class()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+
+class RecipePagination(HybridPagination):
+    cursor_class = RecipeCursorPagination
+
+
+class SubscriptionPagination(HybridPagination):
+    cursor_class = SubscriptionCursorPagination
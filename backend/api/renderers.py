@@ -0,0 +1,27 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class ExportRenderer(JSONRenderer):
+    """
+    Рендерер формата выгрузки списка покупок.
+    Тело выгрузки формирует само представление, а через рендерер
+    DRF принимает параметр ?format=. Ошибки отдаются в JSON.
+    """
+
+    charset = 'utf-8'
+
+
+class PDFRenderer(ExportRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PlainTextRenderer(ExportRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
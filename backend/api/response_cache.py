@@ -0,0 +1,55 @@
+import hashlib
+
+from .cache import (
+    INGREDIENT_CATALOG_VERSION,
+    RECIPE_FEED_VERSION,
+    TAG_CATALOG_VERSION,
+    TwoLevelCache,
+    get_versions
+)
+
+MULTI_VALUE_PARAMS = ('tags', 'author')
+SINGLE_VALUE_PARAMS = ('page', 'limit', 'cursor', 'search')
+
+
+def normalize_params(query_params):
+    """
+    Параметры, от которых зависит ответ анонимному пользователю,
+    в каноническом виде: порядок и повторы значений не важны,
+    is_favorited и is_in_shopping_cart для анонима ничего не меняют.
+    """
+    items = []
+    for name in MULTI_VALUE_PARAMS:
+        values = sorted({value for value in query_params.getlist(name)
+                         if value})
+        if values:
+            items.append(f'{name}={",".join(values)}')
+    for name in SINGLE_VALUE_PARAMS:
+        value = ' '.join(query_params.get(name, '').split())
+        if value and not (name == 'page' and value == '1'):
+            items.append(f'{name}={value}')
+    return '&'.join(items)
+
+
+class ResponseCache(TwoLevelCache):
+    """
+    Готовые JSON-ответы для анонимных пользователей. Ключ включает
+    версии рецептов, тегов и ингредиентов, поэтому запись в них делает
+    все закэшированные страницы недоступными без явного удаления.
+    """
+
+    def get_key(self, request, name, params=''):
+        versions = ':'.join(map(str, get_versions(
+            RECIPE_FEED_VERSION, TAG_CATALOG_VERSION,
+            INGREDIENT_CATALOG_VERSION,
+        )))
+        # Ссылки в ответе абсолютные, поэтому хост входит в ключ.
+        digest = hashlib.sha256(
+            f'{request.scheme}://{request.get_host()}?{params}'.encode()
+        ).hexdigest()
+        return f'{self.prefix}:{versions}:{name}:{digest}'
+
+
+recipe_response_cache = ResponseCache(
+    'recipe_response', 'RECIPE_CACHE_TIMEOUT', 'RECIPE_CACHE_LOCAL_SIZE'
+)
@@ -1,7 +1,14 @@
+import json
+
+from django.conf import settings
+from django.db.models import Prefetch, prefetch_related_objects
 from django.db.transaction import atomic
+from django.http import QueryDict
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from recipes.cart import apply_recipe_deltas
+from recipes.images import image_urls
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -11,6 +18,8 @@ from recipes.models import (
     Tag
 )
 from users.models import User
+from .fields import StreamingBase64ImageField
+from .membership import get_membership
 
 
 class CurrentUserSerializer(serializers.ModelSerializer):
@@ -27,6 +36,8 @@ class CurrentUserSerializer(serializers.ModelSerializer):
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return user.follower.filter(author=obj).exists()
 
 
@@ -73,63 +84,93 @@ class RecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Recipe"""
 
     author = CurrentUserSerializer(read_only=True)
-    ingredients = IngredientInRecipeSerializer(many=True)
+    ingredients = IngredientInRecipeSerializer(
+        source='recipe_ingredients', many=True
+    )
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
     image = Base64ImageField()
+    images = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
+                  'is_in_shopping_cart', 'name', 'image', 'images', 'text',
                   'cooking_time')
 
+    def get_images(self, obj):
+        return image_urls(obj, self.context.get('request'))
+
     def get_is_favorited(self, obj):
         user = self.context['request'].user
         if not user or user.is_anonymous:
             return False
-        return user.favorites.filter(recipe_id=obj).exists()
+        return obj.id in get_membership(self.context['request']).favorites
 
     def get_is_in_shopping_cart(self, obj):
         user = self.context['request'].user
         if not user or user.is_anonymous:
             return False
-        return user.shop_list.filter(recipe_id=obj).exists()
+        return obj.id in get_membership(
+            self.context['request']
+        ).shopping_cart
+
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        data = super().to_representation(instance)
+        thumbnail = self.context.get('thumbnail')
+        if thumbnail and data['images']:
+            data['image'] = data['images'][thumbnail]
+        return data
 
 
 class AddIngredientSerializer(serializers.ModelSerializer):
     """Вспомогательный сериализатор для RecipeCreateSerializer"""
 
-    id = serializers.PrimaryKeyRelatedField(source='ingredient',
-                                            queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
 
     class Meta:
         model = IngredientInRecipe
         fields = ('id', 'amount')
 
-    def create(self, validated_data):
-        return IngredientInRecipe.objects.create(
-            ingredient=validated_data.get('id'),
-            amount=validated_data.get('amount')
-        )
-
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания и изменения рецептов"""
 
     author = CurrentUserSerializer(read_only=True)
     ingredients = AddIngredientSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True,
-    )
-    image = Base64ImageField(use_url=True, max_length=None)
+    tags = serializers.ListField(child=serializers.IntegerField())
+    image = StreamingBase64ImageField(use_url=True, max_length=None)
 
     class Meta:
         model = Recipe
         fields = ('id', 'author', 'ingredients', 'tags', 'image', 'name',
                   'text', 'cooking_time',)
 
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            data = self.parse_multipart(data)
+        return super().to_internal_value(data)
+
+    @staticmethod
+    def parse_multipart(data):
+        """
+        В multipart-запросе теги передаются повторяющимся полем tags,
+        а ингредиенты - JSON-строкой в поле ingredients.
+        """
+        parsed = data.dict()
+        if 'tags' in data:
+            parsed['tags'] = data.getlist('tags')
+        if 'ingredients' in data:
+            try:
+                parsed['ingredients'] = json.loads(data['ingredients'])
+            except ValueError:
+                raise serializers.ValidationError(
+                    {'ingredients': 'Ожидается JSON-список ингредиентов.'}
+                )
+        return parsed
+
     def create_ingredients(self, recipe, ingredients):
         IngredientInRecipe.objects.bulk_create([
             IngredientInRecipe(
@@ -139,17 +180,45 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             ) for ingredient in ingredients
         ])
 
+    @staticmethod
+    def ids_error(message, missing):
+        return serializers.ValidationError(
+            f'{message}: {", ".join(map(str, sorted(missing)))}'
+        )
+
+    def validate_tags(self, value):
+        """Все теги проверяются одним запросом."""
+        ids = list(dict.fromkeys(value))
+        tags = Tag.objects.in_bulk(ids)
+        missing = set(ids) - tags.keys()
+        if missing:
+            raise self.ids_error('Теги не найдены', missing)
+        return [tags[tag_id] for tag_id in ids]
+
+    def validate_ingredients(self, value):
+        """
+        Все ингредиенты проверяются одним запросом, в ответе
+        перечисляются все повторы и все несуществующие id.
+        """
+        seen, duplicates = set(), set()
+        for item in value:
+            (duplicates if item['id'] in seen else seen).add(item['id'])
+        if duplicates:
+            raise self.ids_error(
+                'Есть повторяющиеся ингредиенты', duplicates
+            )
+        ingredients = Ingredient.objects.in_bulk(seen)
+        missing = seen - ingredients.keys()
+        if missing:
+            raise self.ids_error('Ингредиенты не найдены', missing)
+        return [
+            {'ingredient': ingredients[item['id']], 'amount': item['amount']}
+            for item in value
+        ]
+
     def validate(self, data):
-        ingredients = data['ingredients']
-        ingredients_list = []
-        for ingredient in ingredients:
-            ingredient_id = ingredient['id']
-            if ingredient_id in ingredients_list:
-                raise serializers.ValidationError(
-                    'Есть повторяющиеся ингредиенты!'
-                )
-            ingredients_list.append(ingredient_id)
-        if data['cooking_time'] <= 0:
+        cooking_time = data.get('cooking_time')
+        if cooking_time is not None and cooking_time <= 0:
             raise serializers.ValidationError(
                 'Время приготовления должно быть больше 0!'
             )
@@ -168,15 +237,72 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         recipe.tags.set(tags)
         return recipe
 
+    def update_ingredients(self, recipe, ingredients):
+        """
+        Приводит ингредиенты рецепта к новому списку: удаляет и добавляет
+        только изменившиеся строки, количество обновляет на месте.
+        """
+        amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        current = {
+            row.ingredient_id: row
+            for row in IngredientInRecipe.objects.filter(recipe_parent=recipe)
+        }
+        removed = [
+            row.id for ingredient_id, row in current.items()
+            if ingredient_id not in amounts
+        ]
+        changed = []
+        deltas = {
+            ingredient_id: amount for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
+        }
+        for ingredient_id, row in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != row.amount:
+                deltas[ingredient_id] = amount - row.amount
+                row.amount = amount
+                changed.append(row)
+        if removed:
+            IngredientInRecipe.objects.filter(id__in=removed).delete()
+        if changed:
+            IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        self.create_ingredients(recipe, [
+            ingredient for ingredient in ingredients
+            if ingredient['ingredient'].id not in current
+        ])
+        # Массовые операции идут мимо сигналов, корзины обновляем сами.
+        apply_recipe_deltas(recipe.id, deltas)
+
     @atomic
+    def save(self, **kwargs):
+        """
+        Закрывает временный файл изображения: хранилище перемещает его,
+        и без явного закрытия tempfile пытается удалить файл повторно.
+        """
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get('image')
+            if image is not None:
+                image.close()
+
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        recipe = instance
-        IngredientInRecipe.objects.filter(recipe_parent=recipe).delete()
-        self.create_ingredients(recipe, ingredients)
-        return super().update(recipe, validated_data)
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
+        if tags is not None:
+            instance.tags.set(tags)
+        return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        prefetch_related_objects([instance], 'tags', Prefetch(
+            'recipe_ingredients',
+            queryset=IngredientInRecipe.objects.select_related('ingredient')
+        ))
         return RecipeSerializer(
             instance,
             context={
@@ -195,6 +321,14 @@ class RecipeShortSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if data['image']:
+            data['image'] = image_urls(
+                instance, self.context.get('request')
+            )[settings.RECIPE_LIST_THUMBNAIL]
+        return data
+
 
 class FollowSerializer(CurrentUserSerializer):
     """Сериализатор для модели Follow"""
@@ -207,6 +341,8 @@ class FollowSerializer(CurrentUserSerializer):
                   'is_subscribed', 'recipes', 'recipes_count',)
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'page_recipes'):
+            return RecipeShortSerializer(obj.page_recipes, many=True).data
         request = self.context.get('request')
         recipes = obj.recipes.all()
         recipes_limit = request.query_params.get('recipes_limit')
@@ -219,7 +355,7 @@ class FollowSerializer(CurrentUserSerializer):
 
     @staticmethod
     def get_recipes_count(obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 class FavoriteSerializer(RecipeShortSerializer):
@@ -1,22 +1,46 @@
+import csv
+import hashlib
 import io
+import json
+import os
+import threading
+from functools import lru_cache
 
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
+SHOPPING_CART_CACHE_PREFIX = 'shopping_cart_pdf'
 
-def create_shopping_cart(ingredients_cart):
-    """Функция для формирования списка покупок."""
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = (
-        "attachment; filename='shopping_cart.pdf'"
-    )
+
+@lru_cache(maxsize=None)
+def register_fonts():
+    """Регистрирует шрифт один раз на процесс."""
     pdfmetrics.registerFont(
-        TTFont('Arial', 'data/arial.ttf', 'UTF-8')
+        TTFont('Arial', os.path.join(settings.BASE_DIR, 'data', 'arial.ttf'),
+               'UTF-8')
     )
-    buffer = io.BytesIO()
-    pdf_file = canvas.Canvas(buffer)
+
+
+def get_cart_key(ingredients_cart):
+    """Ключ кэша по содержимому агрегированного списка покупок."""
+    cart_hash = hashlib.sha256()
+    for ingredient in ingredients_cart:
+        cart_hash.update(
+            f"{ingredient['ingredient__name']}\x1f"
+            f"{ingredient['ingredient__measurement_unit']}\x1f"
+            f"{ingredient['ingredient_value']}\x1e".encode()
+        )
+    return f'{SHOPPING_CART_CACHE_PREFIX}:{cart_hash.hexdigest()}'
+
+
+def render_shopping_cart(ingredients_cart, output):
+    """Рисует PDF со списком покупок в файлоподобный объект."""
+    register_fonts()
+    pdf_file = canvas.Canvas(output)
     pdf_file.setFont('Arial', 24)
     pdf_file.drawString(200, 800, 'Список покупок.')
     pdf_file.setFont('Arial', 14)
@@ -36,7 +60,91 @@ def create_shopping_cart(ingredients_cart):
             pdf_file.setFont('Arial', 14)
     pdf_file.showPage()
     pdf_file.save()
-    pdf = buffer.getvalue()
-    buffer.close()
-    response.write(pdf)
+
+
+@lru_cache(maxsize=None)
+def get_render_slots():
+    """Ограничивает число одновременных отрисовок PDF в процессе."""
+    return threading.BoundedSemaphore(settings.PDF_RENDER_WORKERS)
+
+
+def create_shopping_cart(ingredients_cart):
+    """Функция для формирования списка покупок."""
+    ingredients_cart = list(ingredients_cart)
+    cart_key = get_cart_key(ingredients_cart)
+    pdf = cache.get(cart_key)
+    if pdf is None:
+        with get_render_slots():
+            # Пока запрос ждал, такой же список мог отрисовать другой.
+            pdf = cache.get(cart_key)
+            if pdf is None:
+                output = io.BytesIO()
+                render_shopping_cart(ingredients_cart, output)
+                pdf = output.getvalue()
+                cache.set(
+                    cart_key, pdf, settings.SHOPPING_CART_CACHE_TIMEOUT
+                )
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = (
+        "attachment; filename='shopping_cart.pdf'"
+    )
+    return response
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(ingredients_cart):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+    for ingredient in ingredients_cart:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['ingredient_value'],
+            ingredient['ingredient__measurement_unit'],
+        ))
+
+
+def stream_text(ingredients_cart):
+    yield 'Список покупок.\n'
+    for number, ingredient in enumerate(ingredients_cart, start=1):
+        yield (
+            f"{number}. {ingredient['ingredient__name']}: "
+            f"{ingredient['ingredient_value']} "
+            f"{ingredient['ingredient__measurement_unit']}.\n"
+        )
+
+
+def stream_json(ingredients_cart):
+    separator = '['
+    for ingredient in ingredients_cart:
+        yield separator + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'amount': ingredient['ingredient_value'],
+            'measurement_unit': ingredient['ingredient__measurement_unit'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', stream_csv),
+    'txt': ('text/plain; charset=utf-8', stream_text),
+    'json': ('application/json', stream_json),
+}
+
+
+def stream_shopping_cart(ingredients_cart, export_format):
+    """Потоковая выгрузка списка покупок в текстовых форматах."""
+    content_type, stream = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(
+        stream(ingredients_cart), content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f"attachment; filename='shopping_cart.{export_format}'"
+    )
     return response
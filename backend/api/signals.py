@@ -0,0 +1,134 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingList,
+    Tag
+)
+from users.models import User
+from .authentication import token_cache
+from .cache import (
+    INGREDIENT_CATALOG_VERSION,
+    RECIPE_FEED_VERSION,
+    TAG_CATALOG_VERSION,
+    bump_version
+)
+from .membership import RecipeMembership
+
+# Поля автора, которые отдаются вместе с рецептами ленты.
+FEED_AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+def invalidate_recipe_membership(instance, **kwargs):
+    transaction.on_commit(
+        lambda: RecipeMembership.invalidate(instance.user_id)
+    )
+
+
+class VersionBump:
+    """Увеличение версии после коммита, одно на транзакцию."""
+
+    def __init__(self, key):
+        self.key = key
+
+    def __call__(self):
+        bump_version(self.key)
+
+
+def bump_version_on_commit(key):
+    connection = transaction.get_connection()
+    if any(
+        isinstance(callback, VersionBump) and callback.key == key
+        for _, callback in connection.run_on_commit
+    ):
+        return
+    transaction.on_commit(VersionBump(key))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_catalog(**kwargs):
+    # Иначе параллельный запрос соберет снимок из данных до коммита
+    # и сохранит его под новой версией.
+    bump_version_on_commit(TAG_CATALOG_VERSION)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_catalog(**kwargs):
+    bump_version_on_commit(INGREDIENT_CATALOG_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_feed(action='post_save', **kwargs):
+    if not action.startswith('post_'):
+        return
+    bump_version_on_commit(RECIPE_FEED_VERSION)
+
+
+@receiver(pre_save, sender=User)
+def remember_feed_author(instance, update_fields, using, **kwargs):
+    """Запоминает поля автора из ленты, чтобы сравнить их после записи."""
+    instance.previous_feed_author = None
+    if instance.pk is None or (
+        update_fields is not None
+        and not set(update_fields) & set(FEED_AUTHOR_FIELDS)
+    ):
+        return
+    instance.previous_feed_author = User.objects.using(using).filter(
+        pk=instance.pk
+    ).values_list(*FEED_AUTHOR_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_recipe_feed_author(instance, created, **kwargs):
+    """У нового пользователя нет рецептов, вход меняет только last_login."""
+    previous = getattr(instance, 'previous_feed_author', None)
+    if created or previous is None:
+        return
+    if previous != tuple(
+        getattr(instance, field) for field in FEED_AUTHOR_FIELDS
+    ):
+        bump_version_on_commit(RECIPE_FEED_VERSION)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(instance, **kwargs):
+    """Выход через djoser удаляет токен."""
+    key = token_cache.get_key(instance.key)
+    transaction.on_commit(lambda: token_cache.delete(key))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(instance, update_fields, **kwargs):
+    """Смена пароля, блокировка и правка профиля меняют пользователя."""
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    keys = [
+        token_cache.get_key(key) for key in Token.objects.filter(
+            user_id=instance.pk
+        ).values_list('key', flat=True)
+    ]
+    if keys:
+        transaction.on_commit(
+            lambda: [token_cache.delete(key) for key in keys]
+        )
@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from users.models import User
+
+URL = '/api/users/me/'
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    """В кэше токенов нет хэша пароля, попадание не ходит в базу."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.local.clear()
+        self.user = User.objects.create_user(
+            email='cook@example.com', username='cook', password='secret',
+            first_name='Иван', last_name='Иванов',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.cache_key = token_cache.get_key(self.token.key)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_password_hash_not_cached(self):
+        self.assertEqual(self.client.get(URL).status_code, 200)
+        cached = cache.get(self.cache_key)
+        self.assertNotIn('password', cached)
+        self.assertEqual(cached['id'], self.user.id)
+        self.assertTrue(cached['is_active'])
+
+    def test_hit_skips_user_queries(self):
+        self.client.get(URL)
+        token_cache.local.clear()
+        # Остается только проверка подписки на самого себя.
+        with self.assertNumQueries(1):
+            response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['username'], 'cook')
+        self.assertEqual(response.data['email'], 'cook@example.com')
+        self.assertEqual(response.data['first_name'], 'Иван')
+
+    def test_inactive_user_rejected_on_every_request(self):
+        self.client.get(URL)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(URL).status_code, 401)
+        self.assertFalse(cache.get(self.cache_key)['is_active'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(URL).status_code, 401)
+
+    def test_stale_cache_entry_is_checked(self):
+        self.client.get(URL)
+        cached = cache.get(self.cache_key)
+        token_cache.set(self.cache_key, {**cached, 'is_active': False})
+        self.assertEqual(self.client.get(URL).status_code, 401)
@@ -0,0 +1,24 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from api.cache import bump_version, get_version
+
+KEY = 'test_version'
+
+
+class VersionTest(SimpleTestCase):
+    """Вытесненный ключ версии не возвращает прежние версии."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_evicted_version_not_reused(self):
+        seen = {get_version(KEY), bump_version(KEY)}
+        cache.delete(KEY)
+        self.assertNotIn(get_version(KEY), seen)
+
+    def test_bump_of_evicted_version_not_reused(self):
+        seen = {get_version(KEY), bump_version(KEY)}
+        cache.delete(KEY)
+        self.assertNotIn(bump_version(KEY), seen)
+        self.assertEqual(bump_version(KEY), get_version(KEY))
@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from api.cache import (
+    INGREDIENT_CATALOG_VERSION,
+    TAG_CATALOG_VERSION,
+    get_version
+)
+from recipes.models import Ingredient, Tag
+
+
+class CatalogVersionTest(TransactionTestCase):
+
+    def assert_bumped_on_commit(self, key, change):
+        version = get_version(key)
+        with transaction.atomic():
+            change()
+            self.assertEqual(get_version(key), version)
+        self.assertEqual(get_version(key), version + 1)
+
+    def test_tag_version_bumped_after_commit(self):
+        self.assert_bumped_on_commit(
+            TAG_CATALOG_VERSION,
+            lambda: Tag.objects.create(
+                name='Обед', slug='lunch', color='#49B64E'
+            ),
+        )
+
+    def test_ingredient_version_bumped_after_commit(self):
+        ingredient = Ingredient.objects.create(
+            name='солод', measurement_unit='г'
+        )
+
+        def change():
+            ingredient.measurement_unit = 'кг'
+            ingredient.save()
+            ingredient.delete()
+
+        self.assert_bumped_on_commit(INGREDIENT_CATALOG_VERSION, change)
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils.connection import ConnectionDoesNotExist
+from rest_framework.test import APIClient
+
+from api.db_router import read_database
+from api.ingredient_index import ingredient_index
+from api.membership import RecipeMembership
+from api.response_cache import recipe_response_cache
+from api.views import ingredient_catalog, tag_catalog
+from recipes.models import Favorite, Ingredient, Tag
+
+# Реплики с таким именем нет: любое чтение из нее падает.
+MISSING_REPLICA = 'missing_replica'
+
+
+class CacheFillReadsPrimaryTest(TestCase):
+    """Данные для общих кэшей читаются из основной базы, не из реплики."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name='Обед', slug='lunch', color='#49B64E')
+        Ingredient.objects.create(name='солод', measurement_unit='г')
+
+    def setUp(self):
+        cache.clear()
+        recipe_response_cache.local.clear()
+        token = read_database.set(MISSING_REPLICA)
+        self.addCleanup(read_database.reset, token)
+
+    def test_replica_is_used_for_plain_reads(self):
+        with self.assertRaises(ConnectionDoesNotExist):
+            list(Tag.objects.all())
+
+    def test_catalog_snapshots(self):
+        tag_catalog._build()
+        ingredient_catalog._build()
+        self.assertIn('lunch'.encode(), tag_catalog.body)
+
+    def test_ingredient_index(self):
+        ingredient_index._build()
+        self.assertEqual(ingredient_index.search('сол', None)[0]['name'],
+                         'солод')
+
+    def test_membership(self):
+        self.assertEqual(len(RecipeMembership.load_ids(Favorite, 1)), 0)
+
+    @override_settings(REPLICA_DATABASES=[MISSING_REPLICA])
+    def test_anonymous_response_cache_fill(self):
+        response = APIClient().get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from api.cache import RECIPE_FEED_VERSION, get_version
+from users.models import User
+
+
+class FeedAuthorVersionTest(TransactionTestCase):
+    """Лента устаревает только при смене полей автора, видных в ней."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='cook@example.com', username='cook', password='secret',
+            first_name='Иван', last_name='Иванов',
+        )
+
+    def assert_version_change(self, change, delta):
+        version = get_version(RECIPE_FEED_VERSION)
+        change()
+        self.assertEqual(get_version(RECIPE_FEED_VERSION), version + delta)
+
+    def test_signup_keeps_feed(self):
+        self.assert_version_change(
+            lambda: User.objects.create_user(
+                email='new@example.com', username='new', password='secret',
+                first_name='Петр', last_name='Петров',
+            ),
+            0,
+        )
+
+    def test_login_keeps_feed(self):
+        def change():
+            self.user.last_login = timezone.now()
+            self.user.save(update_fields=['last_login'])
+
+        self.assert_version_change(change, 0)
+
+    def test_password_change_keeps_feed(self):
+        def change():
+            self.user.set_password('another')
+            self.user.save()
+
+        self.assert_version_change(change, 0)
+
+    def test_rename_bumps_feed(self):
+        def change():
+            self.user.first_name = 'Иоанн'
+            self.user.save()
+
+        self.assert_version_change(change, 1)
@@ -0,0 +1,69 @@
+import base64
+import gc
+import io
+import shutil
+import sys
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from api.response_cache import recipe_response_cache
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def encode_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (2, 2)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class Base64ImageUploadTest(TestCase):
+    """Временный файл изображения закрывается после сохранения."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        recipe_response_cache.local.clear()
+        token_cache.local.clear()
+        self.user = User.objects.create_user(
+            email='cook@example.com', username='cook', password='secret',
+            first_name='Иван', last_name='Иванов',
+        )
+        self.tag = Tag.objects.create(
+            name='breakfast', slug='breakfast', color='#000000'
+        )
+        self.ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_no_cleanup_warning(self):
+        hook = mock.Mock()
+        with mock.patch.object(sys, 'unraisablehook', hook):
+            response = self.client.post('/api/recipes/', {
+                'name': 'Омлет', 'text': 'Текст', 'cooking_time': 5,
+                'tags': [self.tag.id], 'image': encode_image(),
+                'ingredients': [{'id': self.ingredient.id, 'amount': 2}],
+            }, format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+            del response
+            gc.collect()
+        hook.assert_not_called()
+        image = Recipe.objects.get().image
+        self.assertTrue(image.storage.exists(image.name))
@@ -0,0 +1,116 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from api.response_cache import recipe_response_cache
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingList,
+    Tag
+)
+from users.models import Follow, User
+
+RECIPES = 8
+
+
+def create_user(number):
+    return User.objects.create_user(
+        email=f'cook{number}@example.com', username=f'cook{number}',
+        password='secret', first_name='Иван', last_name='Иванов',
+    )
+
+
+class RecipeListQueriesTest(TestCase):
+    """Число запросов списка рецептов не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.flagged = set()
+        tags = [
+            Tag.objects.create(name=slug, slug=slug, color=f'#00000{number}')
+            for number, slug in enumerate(('breakfast', 'lunch'))
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(3)
+        ]
+        for number in range(RECIPES):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}', text='Текст', cooking_time=10,
+                image='recipes/images/recipe.png',
+                author=create_user(number),
+            )
+            recipe.tags.set(tags)
+            IngredientInRecipe.objects.bulk_create([
+                IngredientInRecipe(
+                    recipe_parent=recipe, ingredient=ingredient, amount=5
+                )
+                for ingredient in ingredients
+            ])
+            if number % 2:
+                cls.recipe = recipe
+                cls.flagged.add(recipe.name)
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+                ShoppingList.objects.create(user=cls.user, recipe=recipe)
+                Follow.objects.create(user=cls.user, author=recipe.author)
+
+    def setUp(self):
+        cache.clear()
+        recipe_response_cache.local.clear()
+        token_cache.local.clear()
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_same_queries(self, client, queries):
+        for limit in (2, RECIPES):
+            cache.clear()
+            recipe_response_cache.local.clear()
+            with self.assertNumQueries(queries):
+                response = client.get(f'/api/recipes/?limit={limit}')
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_anonymous(self):
+        self.assert_same_queries(self.anonymous, 4)
+
+    def test_authenticated(self):
+        self.assert_same_queries(self.client, 6)
+
+    def test_authenticated_flags(self):
+        with self.assertNumQueries(6):
+            response = self.client.get(f'/api/recipes/?limit={RECIPES}')
+        for recipe in response.data['results']:
+            flagged = recipe['name'] in self.flagged
+            self.assertEqual(recipe['is_favorited'], flagged)
+            self.assertEqual(recipe['is_in_shopping_cart'], flagged)
+            self.assertEqual(recipe['author']['is_subscribed'], flagged)
+
+    def test_detail_anonymous(self):
+        with self.assertNumQueries(3):
+            response = self.anonymous.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(len(response.data['ingredients']), 3)
+
+    def test_detail_authenticated(self):
+        with self.assertNumQueries(5):
+            response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertTrue(response.data['is_favorited'])
+        self.assertTrue(response.data['is_in_shopping_cart'])
+        self.assertTrue(response.data['author']['is_subscribed'])
+
+    def test_search_vector_not_loaded(self):
+        recipe_id = Recipe.objects.values_list('id', flat=True).first()
+        for client in (self.anonymous, self.client):
+            with CaptureQueriesContext(connection) as context:
+                client.get('/api/recipes/')
+                client.get(f'/api/recipes/{recipe_id}/')
+            for query in context.captured_queries:
+                self.assertNotIn('search_vector', query['sql'])
@@ -0,0 +1,86 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api import shop_cart
+from api.authentication import token_cache
+from recipes.models import Ingredient, ShoppingCartTotal
+from users.models import User
+
+URL = '/api/recipes/download_shopping_cart/'
+EXPECTED = 'Список покупок.\n1. мука: 300 г.\n2. соль: 5 г.\n'
+
+
+class DownloadShoppingCartTest(TestCase):
+    """Выгрузка списка покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='cook@example.com', username='cook', password='secret',
+            first_name='Иван', last_name='Иванов',
+        )
+        for name, amount in (('соль', 5), ('мука', 300)):
+            ShoppingCartTotal.objects.create(
+                user=cls.user, amount=amount,
+                ingredient=Ingredient.objects.create(
+                    name=name, measurement_unit='г'
+                ),
+            )
+
+    def setUp(self):
+        cache.clear()
+        token_cache.local.clear()
+
+    def test_text_streams_from_database(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(URL, {'format': 'txt'})
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content, EXPECTED)
+
+    def test_pdf_rendered_once(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch.object(
+            shop_cart, 'render_shopping_cart',
+            wraps=shop_cart.render_shopping_cart,
+        ) as render:
+            first = client.get(URL, {'format': 'pdf'})
+            second = client.get(URL, {'format': 'pdf'})
+        self.assertEqual(render.call_count, 1)
+        self.assertTrue(first.content.startswith(b'%PDF'))
+        self.assertEqual(first.content, second.content)
+
+    @override_settings(PDF_RENDER_WORKERS=2)
+    def test_pdf_renders_bounded(self):
+        shop_cart.get_render_slots.cache_clear()
+        self.addCleanup(shop_cart.get_render_slots.cache_clear)
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def render(ingredients_cart, output):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+
+        carts = [
+            [{'ingredient__name': f'соль {number}', 'ingredient_value': 1,
+              'ingredient__measurement_unit': 'г'}]
+            for number in range(6)
+        ]
+        with mock.patch.object(shop_cart, 'render_shopping_cart', render):
+            with ThreadPoolExecutor(max_workers=6) as pool:
+                list(pool.map(shop_cart.create_shopping_cart, carts))
+        self.assertEqual(max(peak), 2)
@@ -0,0 +1,44 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import Follow, User
+
+URL = '/api/users/subscriptions/'
+
+
+def create_user(name):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name, password='secret',
+        first_name='Иван', last_name='Иванов',
+    )
+
+
+class SubscriptionsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.author = create_user('author')
+        for number in range(3):
+            Recipe.objects.create(
+                name=f'Рецепт {number}', text='Текст', cooking_time=10,
+                image='recipes/images/recipe.png', author=cls.author,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_empty_page_with_recipes_limit(self):
+        response = self.client.get(URL, {'recipes_limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+    def test_recipes_limit(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(URL, {'recipes_limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results'][0]['recipes']), 2)
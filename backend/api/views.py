@@ -1,10 +1,28 @@
-from django.db.models import Sum
+from django.conf import settings
+from django.db.models import (
+    BooleanField,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Value,
+    Window
+)
+from django.db.models.functions import RowNumber
+from django.db.transaction import atomic
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from rest_framework.permissions import (
+    SAFE_METHODS,
+    AllowAny,
+    IsAdminUser,
+    IsAuthenticated
+)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
 from recipes.models import (
@@ -12,11 +30,20 @@ from recipes.models import (
     Ingredient,
     IngredientInRecipe,
     Recipe,
+    ShoppingCartTotal,
     ShoppingList,
     Tag
 )
 from users.models import User, Follow
+from .authentication import token_cache
+from .cache import INGREDIENT_CATALOG_VERSION, TAG_CATALOG_VERSION
+from .catalog import CatalogSnapshot
+from .db_router import primary_reads
 from .filters import IngredientSearchFilter, RecipeFilter
+from .ingredient_index import ingredient_index
+from .pagination import RecipePagination, SubscriptionPagination
+from .renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
+from .response_cache import normalize_params, recipe_response_cache
 from .serializers import (
     FavoriteSerializer,
     FollowSerializer,
@@ -27,7 +54,14 @@ from .serializers import (
     TagSerializer,
     CurrentUserSerializer
 )
-from .shop_cart import create_shopping_cart
+from .shop_cart import create_shopping_cart, stream_shopping_cart
+
+tag_catalog = CatalogSnapshot(
+    TAG_CATALOG_VERSION, Tag.objects.all(), TagSerializer
+)
+ingredient_catalog = CatalogSnapshot(
+    INGREDIENT_CATALOG_VERSION, Ingredient.objects.all(), IngredientSerializer
+)
 
 
 class CurrentUserViewSet(UserViewSet):
@@ -66,13 +100,56 @@ class CurrentUserViewSet(UserViewSet):
             return Response({'error': 'Вы не подписаны на этого пользователя'},
                             status=status.HTTP_400_BAD_REQUEST)
 
+    @staticmethod
+    def attach_recipes(authors, recipes_limit):
+        """
+        Одним запросом загружает рецепты всех авторов страницы, не более
+        recipes_limit на автора, и прикрепляет их к авторам.
+        """
+        if not authors:
+            return
+        recipes = Recipe.objects.filter(author__in=authors).only(
+            'id', 'name', 'image', 'image_variants', 'cooking_time',
+            'author_id'
+        )
+        try:
+            recipes_limit = int(recipes_limit)
+        except (TypeError, ValueError):
+            recipes_limit = None
+        if recipes_limit is not None:
+            ranked = recipes.annotate(row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('author_id')],
+                order_by=F('pub_date').desc(),
+            )).values(
+                'id', 'name', 'image', 'image_variants', 'cooking_time',
+                'author_id', 'row_number'
+            )
+            sql, params = ranked.query.sql_with_params()
+            recipes = Recipe.objects.raw(
+                f'SELECT * FROM ({sql}) ranked WHERE row_number <= %s '
+                'ORDER BY author_id, row_number',
+                (*params, recipes_limit)
+            )
+        recipes_by_author = {author.id: [] for author in authors}
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
+        for author in authors:
+            author.page_recipes = recipes_by_author[author.id]
+
     @action(
         detail=False,
         permission_classes=(IsAuthenticated,),
+        pagination_class=SubscriptionPagination,
     )
     def subscriptions(self, request):
         subscriptions_list = self.paginate_queryset(
-            self.request.user.subscribe.all()
+            self.request.user.subscribe.annotate(
+                is_subscribed=Value(True, output_field=BooleanField())
+            )
+        )
+        self.attach_recipes(
+            subscriptions_list, request.query_params.get('recipes_limit')
         )
         serializer = FollowSerializer(
             subscriptions_list, many=True, context={
@@ -88,8 +165,12 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
+    authentication_classes = ()
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return tag_catalog.response(request)
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     """Вьюсет для работы с обьектами класса Ingredien"""
@@ -97,26 +178,121 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
+    authentication_classes = ()
     filter_backends = (DjangoFilterBackend, IngredientSearchFilter)
     search_fields = ('^name', )
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return ingredient_catalog.response(request)
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            limit = None
+        if limit is not None and limit <= 0:
+            limit = None
+        return Response(ingredient_index.search(name, limit))
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """ Контроллер рецептов. """
     queryset = Recipe.objects.all()
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    pagination_class = RecipePagination
     filterset_fields = [
         'tags', 'author', 'is_in_shopping_cart', 'is_favorited'
     ]
 
+    def get_queryset(self):
+        # Поисковый вектор нужен только для фильтрации, не для ответа.
+        queryset = Recipe.objects.defer('search_vector').select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient'
+                )
+            ),
+        )
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset
+        return queryset.annotate(
+            author_is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef('author'))
+            ),
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            'list', normalize_params(request.query_params),
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            f"detail:{kwargs['pk']}", '',
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, name, params, handler, request, *args,
+                        **kwargs):
+        """
+        Анонимный пользователь видит одинаковый JSON, поэтому ответ ему
+        берется из кэша, а при промахе рендерится и сохраняется.
+        """
+        if (not request.user.is_anonymous
+                or request.accepted_renderer.format != 'json'):
+            return handler(request, *args, **kwargs)
+        key = recipe_response_cache.get_key(request, name, params)
+        cached = recipe_response_cache.get(key)
+        if cached is not None:
+            content_type, content = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'HIT'
+            return response
+        with primary_reads():
+            response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response = self.finalize_response(
+                request, response, *args, **kwargs
+            )
+            response.render()
+            recipe_response_cache.set(
+                key, (response['Content-Type'], response.content)
+            )
+        response['X-Cache'] = 'MISS'
+        return response
+
+    @action(
+        detail=False,
+        url_path='cache_stats',
+        permission_classes=(IsAdminUser,),
+    )
+    def cache_stats(self, request):
+        return Response({
+            **recipe_response_cache.get_stats(),
+            'token_auth': token_cache.get_stats(),
+        })
+
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeSerializer
         return RecipeCreateSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'list':
+            context['thumbnail'] = settings.RECIPE_LIST_THUMBNAIL
+        return context
+
     @staticmethod
+    @atomic
     def post_method_for_actions(request, pk, serializers):
         data = {'user': request.user.id, 'recipe': pk}
         serializer = serializers(data=data, context={'request': request})
@@ -125,6 +301,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @staticmethod
+    @atomic
     def delete_method_for_actions(request, pk, model):
         user = request.user
         recipe = get_object_or_404(Recipe, id=pk)
@@ -146,20 +323,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
         detail=False,
         methods=('get',),
         url_path='download_shopping_cart',
-        permission_classes=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            PDFRenderer, CSVRenderer, PlainTextRenderer, JSONRenderer
+        ),
     )
     def download_shopping_cart(self, request):
-        shopping_cart = (
-            IngredientInRecipe.objects.filter(
-                recipe_parent__shop_list__user=request.user
-            ).values(
-                'ingredient__name',
-                'ingredient__measurement_unit',
-            ).order_by(
-                'ingredient__name'
-            ).annotate(ingredient_value=Sum('amount'))
-        )
-        return create_shopping_cart(shopping_cart)
+        shopping_cart = ShoppingCartTotal.objects.filter(
+            user=request.user
+        ).values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+        ).annotate(
+            ingredient_value=F('amount')
+        ).order_by('ingredient__name')
+        export_format = request.accepted_renderer.format
+        if export_format == 'pdf':
+            return create_shopping_cart(shopping_cart)
+        return stream_shopping_cart(shopping_cart.iterator(), export_format)
 
     @action(detail=True, methods=['post'])
     def favorite(self, request, pk):
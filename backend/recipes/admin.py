@@ -45,9 +45,10 @@ class RecipesAdmin(admin.ModelAdmin):
     ]
 
     def favorited(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
     favorited.short_description = 'Кол-во людей добавивших в избранное'
+    favorited.admin_order_field = 'favorites_count'
 
 
 @admin.register(IngredientInRecipe)
@@ -3,3 +3,15 @@ from django.apps import AppConfig
 
 class RecipesConfig(AppConfig):
     name = 'recipes'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from . import signals  # noqa: F401
+        from .search import create_search_index
+
+        post_migrate.connect(
+            lambda using, **kwargs: create_search_index(using),
+            sender=self,
+            weak=False,
+        )
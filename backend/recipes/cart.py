@@ -0,0 +1,111 @@
+from django.db import connections
+from django.db.models import (
+    Case,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+    When
+)
+
+from .models import IngredientInRecipe, ShoppingCartTotal, ShoppingList
+
+TOTALS_TABLE = ShoppingCartTotal._meta.db_table
+UPSERT_SQL = (
+    '{prefix}INSERT INTO {table} (user_id, ingredient_id, amount) {select} '
+    'ON CONFLICT (user_id, ingredient_id) '
+    'DO UPDATE SET amount = {table}.amount + excluded.amount'
+)
+
+
+def upsert_totals(select, params, using, prefix=''):
+    """Прибавляет строки выборки к итогам, создавая недостающие."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            UPSERT_SQL.format(
+                prefix=prefix, table=TOTALS_TABLE, select=select
+            ),
+            params,
+        )
+
+
+def drop_empty(totals):
+    totals.filter(amount__lte=0).delete()
+
+
+def add_recipe(user_id, recipe_id, using='default'):
+    """Добавляет ингредиенты рецепта в итоги списка покупок."""
+    upsert_totals(
+        'SELECT %s, ingredient_id, amount '
+        f'FROM {IngredientInRecipe._meta.db_table} '
+        'WHERE recipe_parent_id = %s',
+        [user_id, recipe_id],
+        using,
+    )
+
+
+def remove_recipe(user_id, recipe_id, using='default'):
+    """Вычитает ингредиенты рецепта из итогов списка покупок."""
+    amounts = IngredientInRecipe.objects.using(using).filter(
+        recipe_parent_id=recipe_id
+    )
+    totals = ShoppingCartTotal.objects.using(using).filter(user_id=user_id)
+    totals.filter(
+        ingredient_id__in=amounts.values('ingredient_id')
+    ).update(amount=F('amount') - Subquery(
+        amounts.filter(ingredient_id=OuterRef('ingredient_id')).values(
+            'amount'
+        )[:1]
+    ))
+    drop_empty(totals)
+
+
+def apply_recipe_deltas(recipe_id, deltas, using='default'):
+    """
+    Переносит изменения количеств в рецепте во все списки покупок,
+    где он есть. deltas - словарь {id ингредиента: изменение}.
+    Прибавки и убавки выполняются одним запросом каждая; убавки только
+    обновляют существующие строки и никогда их не создают.
+    """
+    added = [(pk, delta) for pk, delta in deltas.items() if delta > 0]
+    removed = {pk: delta for pk, delta in deltas.items() if delta < 0}
+    if added:
+        upsert_totals(
+            'SELECT cart.user_id, deltas.ingredient_id, deltas.amount '
+            f'FROM {ShoppingList._meta.db_table} cart, deltas '
+            'WHERE cart.recipe_id = %s',
+            [value for row in added for value in row] + [recipe_id],
+            using,
+            prefix='WITH deltas (ingredient_id, amount) AS (VALUES {}) '
+                   .format(', '.join(['(%s, %s)'] * len(added))),
+        )
+    if removed:
+        totals = ShoppingCartTotal.objects.using(using).filter(
+            ingredient_id__in=removed,
+            user_id__in=ShoppingList.objects.using(using).filter(
+                recipe_id=recipe_id
+            ).values('user_id'),
+        )
+        totals.update(amount=F('amount') + Case(
+            *[When(ingredient_id=pk, then=Value(delta))
+              for pk, delta in removed.items()],
+            output_field=IntegerField(),
+        ))
+        drop_empty(ShoppingCartTotal.objects.using(using).filter(
+            ingredient_id__in=removed
+        ))
+
+
+def compute_totals(using='default'):
+    """Итоги списков покупок, посчитанные заново по рецептам."""
+    return {
+        (row['recipe_parent__shop_list__user'], row['ingredient']):
+            row['total']
+        for row in IngredientInRecipe.objects.using(using).filter(
+            recipe_parent__shop_list__isnull=False
+        ).values(
+            'recipe_parent__shop_list__user', 'ingredient'
+        ).annotate(total=Sum('amount')).order_by().iterator()
+    }
@@ -0,0 +1,121 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import Image
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = 'recipes/thumbnails'
+VARIANT_FORMATS = (('WEBP', 'webp'), ('JPEG', 'jpg'))
+
+
+def variant_name(name, size, extension):
+    """
+    Путь варианта изображения относительно MEDIA_ROOT. Хэш полного пути
+    различает файлы с одинаковым именем и разным расширением.
+    """
+    stem = os.path.splitext(os.path.basename(name))[0]
+    digest = hashlib.sha256(name.encode()).hexdigest()[:8]
+    return f'{THUMBNAIL_DIR}/{size}/{stem}_{digest}.{extension}'
+
+
+def make_variants(name, media_root, sizes):
+    """
+    Создает уменьшенные копии изображения в JPEG и WebP.
+    Выполняется в отдельном процессе, поэтому не обращается к Django.
+    JPEG пишется последним: его наличие означает, что готовы все форматы.
+    """
+    source = os.path.join(media_root, name)
+    with Image.open(source) as image:
+        image = image.convert('RGB')
+        for size, pixels in sizes.items():
+            thumbnail = image.copy()
+            thumbnail.thumbnail((pixels, pixels))
+            for image_format, extension in VARIANT_FORMATS:
+                target = os.path.join(
+                    media_root, variant_name(name, size, extension)
+                )
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                temporary = f'{target}.tmp'
+                thumbnail.save(
+                    temporary, image_format, quality=80, optimize=True
+                )
+                os.replace(temporary, target)
+    return name, list(sizes)
+
+
+@lru_cache(maxsize=None)
+def get_pool():
+    """Пул процессов для обработки изображений, один на воркер."""
+    return ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+
+
+def save_variants(name, sizes):
+    """Запоминает готовые размеры у рецептов с этим файлом изображения."""
+    Recipe.objects.filter(image=name).update(image_variants={name: sizes})
+
+
+def record_variants(future):
+    """Вызывается в служебном потоке пула после обработки изображения."""
+    error = future.exception()
+    if error is not None:
+        logger.error('Не удалось обработать изображение: %s', error)
+        return
+    close_old_connections()
+    save_variants(*future.result())
+
+
+def schedule_variants(recipe):
+    """Ставит создание вариантов изображения в очередь пула."""
+    if not recipe.image or variants_ready(
+        recipe.image.name, recipe.image_variants
+    ):
+        return
+    future = get_pool().submit(
+        make_variants, recipe.image.name, settings.MEDIA_ROOT,
+        settings.RECIPE_THUMBNAIL_SIZES
+    )
+    future.add_done_callback(record_variants)
+
+
+def variants_ready(name, image_variants):
+    """Созданы ли для файла все размеры из настроек."""
+    return set(image_variants.get(name, ())).issuperset(
+        settings.RECIPE_THUMBNAIL_SIZES
+    )
+
+
+def image_urls(recipe, request=None):
+    """
+    Ссылки на оригинал и варианты изображения рецепта. Пока варианты
+    не готовы, вместо них отдается оригинал.
+    """
+    image = recipe.image
+    if not image:
+        return {}
+
+    def absolute(url):
+        return request.build_absolute_uri(url) if request else url
+
+    original = absolute(image.url)
+    urls = {'original': original}
+    ready = recipe.image_variants.get(image.name, ())
+    for size in settings.RECIPE_THUMBNAIL_SIZES:
+        if size in ready:
+            urls[size] = absolute(default_storage.url(
+                variant_name(image.name, size, 'jpg')
+            ))
+            urls[f'{size}_webp'] = absolute(default_storage.url(
+                variant_name(image.name, size, 'webp')
+            ))
+        else:
+            urls[size] = urls[f'{size}_webp'] = original
+    return urls
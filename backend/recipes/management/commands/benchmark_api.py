@@ -0,0 +1,354 @@
+import json
+import math
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingList,
+    Tag
+)
+from recipes.search import update_search_index
+from users.models import Follow
+
+User = get_user_model()
+
+BATCH_SIZE = 2000
+TAGS = ('breakfast', 'lunch', 'dinner', 'dessert', 'soup', 'salad')
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark-api',
+    }
+}
+
+
+def percentile(values, rank):
+    ordered = sorted(values)
+    index = max(math.ceil(rank / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряем задержку, число запросов и память эндпоинтов API '
+        'на детерминированных данных во временной тестовой базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--ingredients', type=int, default=1000)
+        parser.add_argument('--favorites', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--baseline', default='benchmark.json',
+            help='JSON-файл с эталонными результатами'
+        )
+        parser.add_argument(
+            '--save', action='store_true',
+            help='Записать результаты как новый эталон'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый рост задержки и памяти, доля от эталона'
+        )
+        parser.add_argument(
+            '--min-delta-ms', type=float, default=2.0,
+            help='Рост задержки меньше этого значения считается шумом'
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу и не пересоздавать данные'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        # Реплики и общий кэш смотрят в рабочее окружение: id тестовых
+        # пользователей совпали бы с настоящими в ключах кэша.
+        with override_settings(
+            REPLICA_DATABASES=[], CACHES=BENCHMARK_CACHES
+        ):
+            results = self.run_on_test_database()
+        self.report(results)
+        if options['save']:
+            with open(options['baseline'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(f"Эталон записан в {options['baseline']}")
+            return
+        self.compare(results)
+
+    def run_on_test_database(self):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+            keepdb=self.options['keepdb'],
+        )
+        try:
+            if not Recipe.objects.exists():
+                self.build_dataset(random.Random(self.options['seed']))
+            return self.run_cases()
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=self.options['keepdb']
+            )
+
+    def build_dataset(self, rng):
+        options = self.options
+        started = time.monotonic()
+        password = make_password('benchmark')
+        User.objects.bulk_create([
+            User(
+                email=f'user{number}@benchmark.local',
+                username=f'user{number}',
+                first_name=f'Имя{number}',
+                last_name=f'Фамилия{number}',
+                password=password,
+            )
+            for number in range(options['users'])
+        ], batch_size=BATCH_SIZE)
+        user_ids = list(User.objects.values_list('id', flat=True))
+        Tag.objects.bulk_create([
+            Tag(name=slug, slug=slug, color=f'#{number:06X}')
+            for number, slug in enumerate(TAGS)
+        ])
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        Ingredient.objects.bulk_create([
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(options['ingredients'])
+        ], batch_size=BATCH_SIZE)
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        now = timezone.now()
+        Recipe.objects.bulk_create([
+            Recipe(
+                name=f'Рецепт {number}',
+                text=f'Суп борщ каша {number}',
+                cooking_time=rng.randint(1, 180),
+                image='recipes/images/benchmark.png',
+                author_id=rng.choice(user_ids),
+            )
+            for number in range(options['recipes'])
+        ], batch_size=BATCH_SIZE)
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        Recipe.objects.bulk_update([
+            Recipe(id=recipe_id, pub_date=now - timedelta(minutes=number))
+            for number, recipe_id in enumerate(recipe_ids)
+        ], ['pub_date'], batch_size=BATCH_SIZE)
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rng.sample(tag_ids, rng.randint(1, 3))
+        ], batch_size=BATCH_SIZE)
+        IngredientInRecipe.objects.bulk_create([
+            IngredientInRecipe(
+                recipe_parent_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in rng.sample(ingredient_ids, rng.randint(3, 12))
+        ], batch_size=BATCH_SIZE)
+        self.create_pairs(Favorite, 'user_id', 'recipe_id',
+                          user_ids, recipe_ids, options['favorites'], rng)
+        self.create_pairs(ShoppingList, 'user_id', 'recipe_id',
+                          user_ids, recipe_ids, options['favorites'], rng)
+        self.create_pairs(Follow, 'user_id', 'author_id',
+                          user_ids, user_ids, options['follows'], rng)
+        call_command('recount', verbosity=0)
+        call_command('verify_cart_totals', fix=True, verbosity=0)
+        update_search_index(recipe_ids)
+        self.stdout.write(
+            f'Данные созданы за {time.monotonic() - started:.1f} с'
+        )
+
+    @staticmethod
+    def create_pairs(model, left, right, left_ids, right_ids, count, rng):
+        """Уникальные пары; у первого пользователя их гарантированно много."""
+        pairs = {
+            (left_ids[0], right_id)
+            for right_id in right_ids[1:31]
+        }
+        for _ in range(count * 2):
+            if len(pairs) >= count:
+                break
+            pair = (rng.choice(left_ids), rng.choice(right_ids))
+            if pair[0] != pair[1]:
+                pairs.add(pair)
+        model.objects.bulk_create([
+            model(**{left: left_id, right: right_id})
+            for left_id, right_id in sorted(pairs)
+        ], batch_size=BATCH_SIZE)
+
+    def get_cases(self):
+        """Эндпоинты из api/urls.py: имя и функция одного обращения."""
+        user = User.objects.order_by('id').first()
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        anonymous = APIClient()
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        other = Recipe.objects.exclude(favoriting__user=user).exclude(
+            shop_list__user=user
+        ).order_by('id').first()
+        author = User.objects.order_by('-recipes_count').first()
+        stranger = User.objects.exclude(id=user.id).exclude(
+            follow__user=user
+        ).order_by('id').first()
+        tag = Tag.objects.order_by('id').first()
+
+        def get(path, using=client, **headers):
+            return lambda: using.get(path, **headers)
+
+        def toggle(path):
+            return lambda: (client.post(path), client.delete(path))
+
+        return {
+            'recipes': get('/api/recipes/'),
+            'recipes_anonymous': get('/api/recipes/', anonymous),
+            'recipes_limit_50': get('/api/recipes/?limit=50'),
+            'recipes_page_20': get('/api/recipes/?page=20'),
+            'recipes_cursor': get('/api/recipes/?cursor='),
+            'recipes_tags': get(f'/api/recipes/?tags={tag.slug}'),
+            'recipes_author': get(f'/api/recipes/?author={author.id}'),
+            'recipes_is_favorited': get('/api/recipes/?is_favorited=1'),
+            'recipes_is_in_shopping_cart': get(
+                '/api/recipes/?is_in_shopping_cart=1'
+            ),
+            'recipes_search': get('/api/recipes/?search=борщ'),
+            'recipe_detail': get(f'/api/recipes/{recipe.id}/'),
+            'recipe_favorite_toggle': toggle(
+                f'/api/recipes/{other.id}/favorite/'
+            ),
+            'recipe_shopping_cart_toggle': toggle(
+                f'/api/recipes/{other.id}/shopping_cart/'
+            ),
+            'download_shopping_cart_pdf': get(
+                '/api/recipes/download_shopping_cart/'
+            ),
+            'download_shopping_cart_csv': get(
+                '/api/recipes/download_shopping_cart/',
+                HTTP_ACCEPT='text/csv',
+            ),
+            'tags': get('/api/tags/'),
+            'tag_detail': get(f'/api/tags/{tag.id}/'),
+            'ingredients': get('/api/ingredients/'),
+            'ingredients_search': get('/api/ingredients/?name=ингредиент 1'),
+            'users': get('/api/users/'),
+            'user_me': get('/api/users/me/'),
+            'user_detail': get(f'/api/users/{author.id}/'),
+            'subscriptions': get('/api/users/subscriptions/?recipes_limit=3'),
+            'subscribe_toggle': toggle(
+                f'/api/users/{stranger.id}/subscribe/'
+            ),
+        }
+
+    def run_cases(self):
+        results = {}
+        for name, request in self.get_cases().items():
+            results[name] = self.measure(request)
+            self.stdout.write(f'{name}: {results[name]}')
+        return results
+
+    def measure(self, request):
+        for _ in range(self.options['warmup']):
+            self.consume(request())
+        durations = []
+        for _ in range(self.options['iterations']):
+            started = time.perf_counter()
+            self.consume(request())
+            durations.append((time.perf_counter() - started) * 1000)
+        reset_queries()
+        with CaptureQueriesContext(connection) as context:
+            response = self.consume(request())
+            # Следующий запрос очистит connection.queries сигналом
+            # request_started, а captured_queries читается из него.
+            queries = len(context.captured_queries)
+        tracemalloc.start()
+        try:
+            self.consume(request())
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            'status': response.status_code,
+            'p50_ms': round(percentile(durations, 50), 2),
+            'p95_ms': round(percentile(durations, 95), 2),
+            'queries': queries,
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    @staticmethod
+    def consume(response):
+        """Дочитывает потоковый ответ; для пары запросов берет последний."""
+        if isinstance(response, tuple):
+            response = response[-1]
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'endpoint':32} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} "
+            f"{'queries':>7} {'peak kb':>9}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:32} {result['status']:>6} {result['p50_ms']:>9} "
+                f"{result['p95_ms']:>9} {result['queries']:>7} "
+                f"{result['peak_kb']:>9}"
+            )
+
+    def compare(self, results):
+        try:
+            with open(self.options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        except FileNotFoundError:
+            self.stdout.write('Эталона нет, сравнение пропущено')
+            return
+        limit = 1 + self.options['tolerance']
+        regressions = []
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if result['status'] != expected['status']:
+                regressions.append(
+                    f"{name}: статус {result['status']} "
+                    f"вместо {expected['status']}"
+                )
+            if result['queries'] > expected['queries']:
+                regressions.append(
+                    f"{name}: запросов {result['queries']} "
+                    f"вместо {expected['queries']}"
+                )
+            for key, noise in (('p95_ms', self.options['min_delta_ms']),
+                               ('peak_kb', 0)):
+                if (result[key] > expected[key] * limit
+                        and result[key] - expected[key] > noise):
+                    regressions.append(
+                        f'{name}: {key} {result[key]} при эталоне '
+                        f'{expected[key]}'
+                    )
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно эталона:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
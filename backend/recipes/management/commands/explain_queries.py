@@ -0,0 +1,189 @@
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, Tag
+
+User = get_user_model()
+
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?')
+SQLITE_ALIAS = re.compile(r'"(\w+)" (?:AS )?"?([A-Z]\d+)\b')
+EXPLAIN_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'explain-queries',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняем эталонные запросы API, получаем планы их SQL через '
+        'EXPLAIN и падаем, если большая таблица читается целиком'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows', type=int, default=10000,
+            help='Таблицы от этого числа строк считаются большими'
+        )
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Обновить статистику планировщика перед проверкой'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError('Поддерживаются PostgreSQL и SQLite')
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        large = {
+            table for table, rows in self.get_table_sizes().items()
+            if rows >= options['min_rows']
+        }
+        self.stdout.write(
+            f"Большие таблицы: {', '.join(sorted(large)) or 'нет'}"
+        )
+        # Реплики не видят тестовых запросов, кэш не должен их скрывать.
+        with override_settings(
+            REPLICA_DATABASES=[], RECIPE_CACHE_TIMEOUT=0,
+            CACHES=EXPLAIN_CACHES,
+        ):
+            failures = []
+            for name, (client, path, headers) in self.get_cases().items():
+                failures.extend(self.check_case(
+                    name, client, path, headers, large
+                ))
+        if failures:
+            raise CommandError(
+                'Последовательное чтение больших таблиц:\n'
+                + '\n'.join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS('Планы в порядке'))
+
+    def get_cases(self):
+        """Запросы RecipeFilter и вьюсетов: имя, клиент, путь, заголовки."""
+        user_id = Favorite.objects.values_list('user', flat=True).first()
+        user = User.objects.filter(id=user_id).first() or User.objects.first()
+        if user is None:
+            raise CommandError('В базе нет пользователей')
+        token, _ = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        anonymous = APIClient()
+        recipe = Recipe.objects.first()
+        tag = Tag.objects.order_by('id').first()
+        cases = {
+            'subscriptions': (
+                client, '/api/users/subscriptions/?recipes_limit=3', {}
+            ),
+            'users': (client, '/api/users/', {}),
+            'user_me': (client, '/api/users/me/', {}),
+            'download_shopping_cart': (
+                client, '/api/recipes/download_shopping_cart/',
+                {'HTTP_ACCEPT': 'text/csv'},
+            ),
+        }
+        if recipe is None:
+            return cases
+        author = recipe.author_id
+        cases.update({
+            'recipes': (client, '/api/recipes/?cursor=', {}),
+            'recipes_anonymous': (anonymous, '/api/recipes/?cursor=', {}),
+            'recipes_author': (client, f'/api/recipes/?author={author}', {}),
+            'recipes_author_cursor': (
+                client, f'/api/recipes/?author={author}&cursor=', {}
+            ),
+            'recipes_is_favorited': (
+                client, '/api/recipes/?is_favorited=1', {}
+            ),
+            'recipes_is_in_shopping_cart': (
+                client, '/api/recipes/?is_in_shopping_cart=1', {}
+            ),
+            'recipes_search': (client, '/api/recipes/?search=борщ', {}),
+            'recipe_detail': (client, f'/api/recipes/{recipe.id}/', {}),
+            'user_detail': (client, f'/api/users/{author}/', {}),
+        })
+        if tag is not None:
+            cases['recipes_tags'] = (
+                client, f'/api/recipes/?tags={tag.slug}', {}
+            )
+        return cases
+
+    def check_case(self, name, client, path, headers, large):
+        cache.clear()
+        reset_queries()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(path, **headers)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        if response.status_code != 200:
+            return [f'{name}: статус {response.status_code}']
+        failures = []
+        selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+        for sql in selects:
+            for table in sorted(self.get_scanned_tables(sql) & large):
+                failures.append(f'{name}: {table} в запросе {sql[:300]}')
+        self.stdout.write(
+            f'{name}: запросов {len(selects)}, '
+            f'проблем {len(failures)}'
+        )
+        return failures
+
+    @staticmethod
+    def get_table_sizes():
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    "SELECT relname, reltuples FROM pg_class "
+                    "WHERE relkind = 'r' AND relnamespace = "
+                    "'public'::regnamespace"
+                )
+                return dict(cursor.fetchall())
+            quote = connection.ops.quote_name
+            sizes = {}
+            for table in connection.introspection.table_names(cursor):
+                cursor.execute(f'SELECT COUNT(*) FROM {quote(table)}')
+                sizes[table] = cursor.fetchone()[0]
+            return sizes
+
+    @staticmethod
+    def get_scanned_tables(sql):
+        """Таблицы, которые план читает последовательно, без индекса."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                nodes = [plan[0]['Plan']]
+                tables = set()
+                while nodes:
+                    node = nodes.pop()
+                    if node['Node Type'] == 'Seq Scan':
+                        tables.add(node['Relation Name'])
+                    nodes.extend(node.get('Plans', []))
+                return tables
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            details = [row[-1] for row in cursor.fetchall()]
+        aliases = dict(
+            (alias, table) for table, alias in SQLITE_ALIAS.findall(sql)
+        )
+        tables = set()
+        for detail in details:
+            match = SQLITE_SCAN.match(detail)
+            if match and 'INDEX' not in detail and 'VIRTUAL' not in detail:
+                tables.add(aliases.get(match.group(1), match.group(1)))
+        return tables
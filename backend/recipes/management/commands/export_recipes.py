@@ -0,0 +1,80 @@
+import json
+import sys
+import time
+
+from django.core.management import BaseCommand
+
+from recipes.models import IngredientInRecipe, Recipe
+
+
+class Command(BaseCommand):
+    help = 'Выгружаем рецепты в NDJSON (один рецепт на строку)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', nargs='?', default='-',
+            help='Путь к файлу, по умолчанию stdout'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def iter_batches(self, batch_size):
+        last_id = 0
+        while True:
+            batch = list(
+                Recipe.objects.filter(id__gt=last_id).order_by('id').values(
+                    'id', 'name', 'text', 'cooking_time', 'image',
+                    'pub_date', 'author__email'
+                )[:batch_size]
+            )
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1]['id']
+
+    def iter_records(self, batch_size):
+        for batch in self.iter_batches(batch_size):
+            recipe_ids = [recipe['id'] for recipe in batch]
+            tags = {recipe_id: [] for recipe_id in recipe_ids}
+            for recipe_id, slug in Recipe.tags.through.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values_list('recipe_id', 'tag__slug'):
+                tags[recipe_id].append(slug)
+            ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+            for recipe_id, name, amount in IngredientInRecipe.objects.filter(
+                recipe_parent_id__in=recipe_ids
+            ).values_list('recipe_parent_id', 'ingredient__name', 'amount'):
+                ingredients[recipe_id].append(
+                    {'name': name, 'amount': amount}
+                )
+            for recipe in batch:
+                yield {
+                    'name': recipe['name'],
+                    'text': recipe['text'],
+                    'cooking_time': recipe['cooking_time'],
+                    'image': recipe['image'],
+                    'pub_date': recipe['pub_date'].isoformat(),
+                    'author': recipe['author__email'],
+                    'tags': tags[recipe['id']],
+                    'ingredients': ingredients[recipe['id']],
+                }
+
+    def handle(self, *args, **options):
+        output = options['output']
+        file = (
+            sys.stdout if output == '-'
+            else open(output, 'w', encoding='utf-8')
+        )
+        started = time.monotonic()
+        exported = 0
+        try:
+            for record in self.iter_records(options['batch_size']):
+                file.write(json.dumps(record, ensure_ascii=False))
+                file.write('\n')
+                exported += 1
+        finally:
+            if file is not sys.stdout:
+                file.close()
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено рецептов: {exported} за {elapsed:.1f} с'
+        ))
@@ -0,0 +1,366 @@
+import io
+import json
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, call_command
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.cache import (
+    INGREDIENT_CATALOG_VERSION,
+    RECIPE_FEED_VERSION,
+    bump_version
+)
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingList,
+    Tag
+)
+from recipes.search import update_search_index
+from users.models import Follow
+
+User = get_user_model()
+
+WORDS = ('суп', 'борщ', 'каша', 'пирог', 'салат', 'рагу', 'омлет', 'плов',
+         'курица', 'грибы', 'сыр', 'томаты', 'тыква', 'рис', 'гречка')
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'
+})
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    if isinstance(value, str):
+        return value.translate(COPY_ESCAPES)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+@contextmanager
+def explicit_pub_date():
+    """bulk_create перезаписывает auto_now_add, а даты нужны разные."""
+    field = Recipe._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерируем большой объем тестовых данных со степенным '
+        'распределением популярности авторов и рецептов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--recipe-ingredients', type=int, default=80000)
+        parser.add_argument('--favorites', type=int, default=100000)
+        parser.add_argument('--shopping-lists', type=int, default=50000)
+        parser.add_argument('--follows', type=int, default=50000)
+        parser.add_argument(
+            '--ingredients', type=int, default=2000,
+            help='Сколько ингредиентов создать, если справочник пуст'
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель степенного распределения популярности'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument(
+            '--defer-indexes', action='store_true',
+            help='Удалить неуникальные индексы на время загрузки'
+        )
+        parser.add_argument(
+            '--defer-constraints', action='store_true',
+            help='Только SQLite: проверять внешние ключи при коммите'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.prefix = f'fake{int(time.time())}'
+        self.copy = connection.vendor == 'postgresql'
+        started = time.monotonic()
+        tables = [
+            model._meta.db_table for model in (
+                Recipe, Recipe.tags.through, IngredientInRecipe,
+                Favorite, ShoppingList, Follow,
+            )
+        ]
+        with transaction.atomic():
+            if options['defer_constraints']:
+                self.defer_constraints()
+            indexes = self.drop_indexes(tables) if (
+                options['defer_indexes']
+            ) else []
+            recipe_ids = self.generate()
+            self.restore_indexes(indexes)
+        self.stdout.write(f'Загрузка: {time.monotonic() - started:.1f} с')
+        call_command('recount', verbosity=0)
+        call_command('verify_cart_totals', fix=True, verbosity=0)
+        for chunk in chunked(recipe_ids, options['chunk_size']):
+            update_search_index(chunk)
+        bump_version(RECIPE_FEED_VERSION)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с'
+        ))
+
+    def generate(self):
+        options = self.options
+        user_ids = self.create_users(options['users'])
+        ingredient_ids = self.get_ingredients(options['ingredients'])
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        recipe_ids = self.create_recipes(user_ids, options['recipes'])
+        if tag_ids:
+            self.insert(Recipe.tags.through, ('recipe_id', 'tag_id'), (
+                (recipe_id, tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in self.rng.sample(
+                    tag_ids, self.rng.randint(1, min(3, len(tag_ids)))
+                )
+            ))
+        self.insert(
+            IngredientInRecipe,
+            ('recipe_parent_id', 'ingredient_id', 'amount'),
+            (
+                (recipe_id, ingredient_id, self.rng.randint(1, 500))
+                for recipe_id, ingredient_id in self.pairs(
+                    recipe_ids, ingredient_ids,
+                    options['recipe_ingredients'], skew_left=False,
+                )
+            ),
+        )
+        for model, count in ((Favorite, options['favorites']),
+                             (ShoppingList, options['shopping_lists'])):
+            self.insert(model, ('user_id', 'recipe_id'), self.pairs(
+                user_ids, recipe_ids, count
+            ))
+        self.insert(Follow, ('user_id', 'author_id'), self.pairs(
+            user_ids, user_ids, options['follows']
+        ))
+        return recipe_ids
+
+    def weights(self, ids):
+        """Накопленные веса ~ 1 / rank ** skew для случайного порядка id."""
+        ranked = list(ids)
+        self.rng.shuffle(ranked)
+        skew = self.options['skew']
+        return ranked, list(accumulate(
+            1 / rank ** skew for rank in range(1, len(ranked) + 1)
+        ))
+
+    def pairs(self, left_ids, right_ids, count, skew_left=True):
+        """
+        Уникальные пары (left, right) в количестве около count: активность
+        левых и популярность правых распределены по степенному закону.
+        Пары собираются по одному левому id, поэтому память не растет
+        с числом строк.
+        """
+        if not left_ids or not right_ids:
+            return
+        lefts, left_weights = self.weights(left_ids) if skew_left else (
+            left_ids, None
+        )
+        per_left = Counter()
+        for start in range(0, count, self.options['chunk_size']):
+            per_left.update(self.rng.choices(
+                lefts, cum_weights=left_weights,
+                k=min(self.options['chunk_size'], count - start),
+            ))
+        rights, right_weights = self.weights(right_ids)
+        for left_id in sorted(per_left):
+            wanted = min(per_left[left_id], len(rights) - 1)
+            chosen = {}
+            for _ in range(3):
+                chosen.update(dict.fromkeys(self.rng.choices(
+                    rights, cum_weights=right_weights, k=wanted
+                )))
+                chosen.pop(left_id, None)
+                if len(chosen) >= wanted:
+                    break
+            else:
+                # Популярные уже выбраны, добираем равномерно.
+                chosen.update(dict.fromkeys(
+                    self.rng.sample(rights, wanted + 1)
+                ))
+                chosen.pop(left_id, None)
+            for right_id in islice(chosen, wanted):
+                yield left_id, right_id
+
+    def create_users(self, count):
+        password = make_password('fake')
+        self.insert(User, (
+            'email', 'username', 'first_name', 'last_name', 'password',
+            'is_active', 'is_staff', 'is_superuser', 'date_joined',
+            'recipes_count',
+        ), (
+            (
+                f'{self.prefix}_{number}@example.com',
+                f'{self.prefix}_{number}',
+                f'Имя{number}', f'Фамилия{number}', password,
+                True, False, False, timezone.now(), 0,
+            )
+            for number in range(count)
+        ))
+        return list(User.objects.filter(
+            username__startswith=f'{self.prefix}_'
+        ).values_list('id', flat=True))
+
+    def get_ingredients(self, count):
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if ingredient_ids:
+            return ingredient_ids
+        self.insert(Ingredient, ('name', 'measurement_unit'), (
+            (f'{self.prefix} ингредиент {number}', 'г')
+            for number in range(count)
+        ))
+        transaction.on_commit(
+            lambda: bump_version(INGREDIENT_CATALOG_VERSION)
+        )
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    def create_recipes(self, user_ids, count):
+        authors, author_weights = self.weights(user_ids)
+        now = timezone.now()
+        rng = self.rng
+        with explicit_pub_date():
+            self.insert(Recipe, (
+                'name', 'text', 'cooking_time', 'image', 'image_variants',
+                'pub_date', 'author_id', 'favorites_count',
+                'shopping_cart_count',
+            ), (
+                (
+                    f'{self.prefix} {" ".join(rng.sample(WORDS, 2))} '
+                    f'{number}',
+                    ' '.join(rng.choices(WORDS, k=20)),
+                    rng.randint(1, 180),
+                    'recipes/images/fake.png', {},
+                    now - timedelta(minutes=rng.randint(0, 525600)),
+                    author, 0, 0,
+                )
+                for number, author in enumerate(rng.choices(
+                    authors, cum_weights=author_weights, k=count
+                ))
+            ))
+        return list(Recipe.objects.filter(
+            name__startswith=f'{self.prefix} '
+        ).values_list('id', flat=True))
+
+    def insert(self, model, fields, rows):
+        """Загружает строки через COPY в PostgreSQL или bulk_create."""
+        started = time.monotonic()
+        total = 0
+        for chunk in chunked(rows, self.options['chunk_size']):
+            if self.copy:
+                self.copy_chunk(model, fields, chunk)
+            else:
+                model.objects.bulk_create([
+                    model(**dict(zip(fields, row))) for row in chunk
+                ])
+            total += len(chunk)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f'{model._meta.db_table}: {total} строк, '
+            f'{total / elapsed:.0f} в секунду'
+        )
+
+    @staticmethod
+    def copy_chunk(model, fields, chunk):
+        quote = connection.ops.quote_name
+        columns = ', '.join(
+            quote(model._meta.get_field(field).column) for field in fields
+        )
+        buffer = io.StringIO()
+        for row in chunk:
+            buffer.write('\t'.join(map(copy_value, row)))
+            buffer.write('\n')
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {quote(model._meta.db_table)} ({columns}) '
+                'FROM STDIN',
+                buffer,
+            )
+
+    @staticmethod
+    def defer_constraints():
+        """
+        Только для SQLite: в PostgreSQL Django создает внешние ключи
+        как DEFERRABLE INITIALLY DEFERRED, они и так проверяются при коммите.
+        """
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA defer_foreign_keys = ON')
+
+    def drop_indexes(self, tables):
+        """Удаляет неуникальные индексы таблиц и возвращает их определения."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT indexname, indexdef FROM pg_indexes '
+                    'WHERE tablename = ANY(%s) AND indexname NOT IN '
+                    '(SELECT conname FROM pg_constraint)',
+                    [tables],
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute(
+                    "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                    'AND sql IS NOT NULL AND tbl_name IN ({})'.format(
+                        ', '.join(['%s'] * len(tables))
+                    ),
+                    tables,
+                )
+            else:
+                return []
+            indexes = [
+                (name, definition) for name, definition in cursor.fetchall()
+                if 'UNIQUE' not in definition.upper()
+            ]
+            for name, _ in indexes:
+                cursor.execute(
+                    f'DROP INDEX {connection.ops.quote_name(name)}'
+                )
+        self.stdout.write(f'Индексов отложено: {len(indexes)}')
+        return indexes
+
+    def restore_indexes(self, indexes):
+        started = time.monotonic()
+        with connection.cursor() as cursor:
+            if indexes and connection.vendor == 'postgresql':
+                # CREATE INDEX не выполняется, пока в транзакции ждут
+                # отложенные проверки внешних ключей.
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            for _, definition in indexes:
+                cursor.execute(definition)
+        if indexes:
+            self.stdout.write(
+                f'Индексы восстановлены за '
+                f'{time.monotonic() - started:.1f} с'
+            )
@@ -0,0 +1,297 @@
+import json
+import os
+import sys
+import time
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils.dateparse import parse_datetime
+
+from api.cache import RECIPE_FEED_VERSION, bump_version
+from recipes.images import schedule_variants
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from recipes.search import update_search_index
+
+User = get_user_model()
+
+
+def clean_field(model, name, value):
+    """Проверка значения валидаторами поля модели."""
+    try:
+        return model._meta.get_field(name).clean(value, None)
+    except ValidationError as error:
+        raise ValidationError(f"{name}: {' '.join(error.messages)}")
+
+
+def clean_tags(tags):
+    if not isinstance(tags, list) or not all(
+        isinstance(slug, str) for slug in tags
+    ):
+        raise ValidationError('tags: ожидается список слагов')
+    return list(dict.fromkeys(tags))
+
+
+def clean_ingredients(items):
+    """Количества по названиям; повторы ингредиента складываются."""
+    if not isinstance(items, list):
+        raise ValidationError('ingredients: ожидается список')
+    amounts = {}
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(
+            item.get('name'), str
+        ):
+            raise ValidationError('ingredients: у ингредиента нет названия')
+        amount = clean_field(IngredientInRecipe, 'amount', item.get('amount'))
+        amounts[item['name']] = amounts.get(item['name'], 0) + amount
+    return {
+        name: clean_field(IngredientInRecipe, 'amount', amount)
+        for name, amount in amounts.items()
+    }
+
+
+def clean_pub_date(value):
+    if value is None:
+        return None
+    try:
+        pub_date = parse_datetime(value)
+    except (TypeError, ValueError):
+        pub_date = None
+    if pub_date is None:
+        raise ValidationError(f'pub_date: некорректная дата {value!r}')
+    return pub_date
+
+
+class Command(BaseCommand):
+    help = 'Загружаем рецепты из NDJSON, выгруженного export_recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input', nargs='?', default='-',
+            help='Путь к файлу, по умолчанию stdin'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--images-dir',
+            help='Каталог с изображениями; без него пути из файла '
+                 'считаются уже лежащими в MEDIA_ROOT'
+        )
+
+    def load_maps(self):
+        self.ingredients = dict(
+            Ingredient.objects.values_list('name', 'id')
+        )
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.authors = dict(User.objects.values_list('email', 'id'))
+
+    def skip(self, number, reason):
+        self.skipped.append(f'Строка {number}: {reason}')
+
+    def iter_records(self, file):
+        for number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                self.skip(number, 'некорректный JSON')
+
+    @staticmethod
+    def clean(record):
+        """Проверяет запись и приводит ее к виду для вставки."""
+        if not isinstance(record, dict):
+            raise ValidationError('запись должна быть объектом')
+        # Валидатор названия из модели не применяется: выгрузка может
+        # содержать названия, созданные в обход API.
+        name = record.get('name')
+        if not isinstance(name, str) or not name.strip():
+            raise ValidationError('name: нет названия')
+        if len(name) > Recipe._meta.get_field('name').max_length:
+            raise ValidationError('name: слишком длинное название')
+        cleaned = {
+            field: clean_field(Recipe, field, record.get(field))
+            for field in ('text', 'cooking_time')
+        }
+        cleaned['name'] = name
+        image = record.get('image')
+        if image is not None and not isinstance(image, str):
+            raise ValidationError('image: ожидается путь к файлу')
+        cleaned.update(
+            author=record.get('author'),
+            image=image,
+            pub_date=clean_pub_date(record.get('pub_date')),
+            tags=clean_tags(record.get('tags', [])),
+            ingredients=clean_ingredients(record.get('ingredients', [])),
+        )
+        return cleaned
+
+    def resolve(self, record):
+        """Переводит имена и слаги записи в id."""
+        author_id = self.authors.get(record['author'])
+        if author_id is None:
+            raise ValidationError(f"нет автора {record['author']}")
+        try:
+            tag_ids = [self.tags[slug] for slug in record['tags']]
+            ingredients = [
+                (self.ingredients[name], amount)
+                for name, amount in record['ingredients'].items()
+            ]
+        except KeyError as error:
+            raise ValidationError(f'неизвестный тег или ингредиент {error}')
+        return author_id, tag_ids, ingredients
+
+    def store_image(self, name):
+        if not self.images_dir or not name:
+            return name
+        path = os.path.join(self.images_dir, name)
+        with open(path, 'rb') as image:
+            stored = default_storage.save(name, File(image))
+        self.stored_images.append(stored)
+        return stored
+
+    def validate(self, records):
+        """Проверенные записи пачки; остальные попадают в пропущенные."""
+        valid = []
+        for number, record in records:
+            try:
+                valid.append((number, self.clean(record)))
+            except ValidationError as error:
+                self.skip(number, ' '.join(error.messages))
+        return valid
+
+    def prepare(self, records):
+        """Отбирает новые рецепты пачки и готовит их к вставке."""
+        records = self.validate(records)
+        existing = set(
+            Recipe.objects.filter(
+                name__in=[record['name'] for _, record in records]
+            ).values_list('name', flat=True)
+        )
+        recipes, links = [], {}
+        for number, record in records:
+            if record['name'] in existing or record['name'] in links:
+                continue
+            try:
+                author_id, tag_ids, ingredients = self.resolve(record)
+                image = self.store_image(record['image'])
+            except ValidationError as error:
+                self.skip(number, f"{record['name']}: {error.messages[0]}")
+                continue
+            except OSError as error:
+                self.skip(number, f"{record['name']}: {error}")
+                continue
+            recipe = Recipe(
+                name=record['name'],
+                text=record['text'],
+                cooking_time=record['cooking_time'],
+                image=image,
+                author_id=author_id,
+            )
+            recipes.append((recipe, record['pub_date']))
+            links[record['name']] = (tag_ids, ingredients)
+        return recipes, links
+
+    def import_batch(self, records):
+        """Файлы изображений откатываются вместе с транзакцией пачки."""
+        self.stored_images = []
+        try:
+            return self.insert_batch(records)
+        except BaseException:
+            for name in self.stored_images:
+                default_storage.delete(name)
+            raise
+
+    @transaction.atomic
+    def insert_batch(self, records):
+        recipes, links = self.prepare(records)
+        if not recipes:
+            return 0
+        Recipe.objects.bulk_create(
+            [recipe for recipe, _ in recipes], batch_size=self.batch_size
+        )
+        recipe_ids = dict(
+            Recipe.objects.filter(name__in=links).values_list('name', 'id')
+        )
+        dated = []
+        for recipe, pub_date in recipes:
+            recipe.id = recipe_ids[recipe.name]
+            if pub_date:
+                recipe.pub_date = pub_date
+                dated.append(recipe)
+        if dated:
+            Recipe.objects.bulk_update(dated, ['pub_date'])
+        Recipe.tags.through.objects.bulk_create(
+            [
+                Recipe.tags.through(recipe_id=recipe_ids[name], tag_id=tag_id)
+                for name, (tag_ids, _) in links.items()
+                for tag_id in tag_ids
+            ],
+            batch_size=self.batch_size,
+        )
+        IngredientInRecipe.objects.bulk_create(
+            [
+                IngredientInRecipe(
+                    recipe_parent_id=recipe_ids[name],
+                    ingredient_id=ingredient_id,
+                    amount=amount,
+                )
+                for name, (_, ingredients) in links.items()
+                for ingredient_id, amount in ingredients
+            ],
+            batch_size=self.batch_size,
+        )
+        authors = Counter(recipe.author_id for recipe, _ in recipes)
+        for author_id, count in authors.items():
+            User.objects.filter(id=author_id).update(
+                recipes_count=F('recipes_count') + count
+            )
+        update_search_index(list(recipe_ids.values()))
+        transaction.on_commit(lambda: bump_version(RECIPE_FEED_VERSION))
+        transaction.on_commit(lambda: [
+            schedule_variants(recipe) for recipe, _ in recipes
+        ])
+        return len(recipes)
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.images_dir = options['images_dir']
+        source = options['input']
+        try:
+            file = (
+                sys.stdin if source == '-'
+                else open(source, encoding='utf-8')
+            )
+        except FileNotFoundError:
+            raise CommandError(f'Файл {source} не найден')
+        self.load_maps()
+        self.skipped = []
+        started = time.monotonic()
+        imported = 0
+        records = self.iter_records(file)
+        try:
+            while True:
+                batch = list(islice(records, self.batch_size))
+                if not batch:
+                    break
+                imported += self.import_batch(batch)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'Загружено рецептов: {imported}, '
+                    f'{imported / max(elapsed, 1e-6) * 60:.0f} в минуту'
+                )
+        finally:
+            if file is not sys.stdin:
+                file.close()
+        for line in self.skipped:
+            self.stderr.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загрузка завершена: {imported} рецептов, '
+            f'пропущено записей: {len(self.skipped)}'
+        ))
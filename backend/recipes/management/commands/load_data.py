@@ -1,24 +1,10 @@
-import csv
-
-from django.conf import settings
-from django.core.management import BaseCommand, CommandError
-
-from recipes.models import Ingredient
+from django.core.management import BaseCommand, call_command
 
 
 class Command(BaseCommand):
-    help = 'Загружаем csv-файл'
+    help = 'Загружаем csv-файл (синоним sync_ingredients)'
 
     def handle(self, *args, **kwargs):
-        data_path = settings.BASE_DIR
-        try:
-            with open(
-                f'{data_path}/data/ingredients.csv', 'r', encoding='utf-8'
-            ) as file:
-                reader = csv.DictReader(file)
-                Ingredient.objects.bulk_create(
-                    Ingredient(**data) for data in reader
-                )
-            self.stdout.write(self.style.SUCCESS('Ингредиенты загружен'))
-        except FileNotFoundError:
-            raise CommandError('Добавьте файл ingredients в директорию data')
+        call_command(
+            'sync_ingredients', stdout=self.stdout, stderr=self.stderr
+        )
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management import BaseCommand, CommandError
+
+from .benchmark_api import percentile
+
+
+async def read_response(reader):
+    """
+    Читает ответ HTTP/1.1 с Content-Length и возвращает статус и
+    признак того, что сервер закрывает соединение.
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Соединение закрыто сервером')
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    return (
+        int(status_line.split()[1]),
+        headers.get('connection', '').lower() == 'close',
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружаем запущенный сервер параллельными GET-запросами '
+        'через keep-alive соединения: пропускная способность и задержки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument(
+            '--header', action='append', default=[],
+            help='Дополнительный заголовок, например "Authorization: Token x"'
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('Нужен адрес вида http://host:port/path')
+        self.host = url.hostname
+        self.port = url.port or 80
+        path = url.path or '/'
+        if url.query:
+            path += f'?{url.query}'
+        self.request = ''.join([
+            f'GET {path} HTTP/1.1\r\n',
+            f'Host: {url.netloc}\r\n',
+            'Accept: application/json\r\n',
+            'Accept-Encoding: identity\r\n',
+            *(f'{header}\r\n' for header in options['header']),
+            '\r\n',
+        ]).encode()
+        self.remaining = options['requests']
+        self.durations = []
+        self.statuses = {}
+        self.errors = 0
+        started = time.perf_counter()
+        asyncio.run(self.run(options['concurrency']))
+        self.report(time.perf_counter() - started)
+
+    async def run(self, concurrency):
+        await asyncio.gather(*(self.worker() for _ in range(concurrency)))
+
+    async def worker(self):
+        reader = writer = None
+        while self.remaining > 0:
+            self.remaining -= 1
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(
+                        self.host, self.port
+                    )
+                writer.write(self.request)
+                status, closed = await read_response(reader)
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                self.errors += 1
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+                continue
+            self.durations.append((time.perf_counter() - started) * 1000)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if closed:
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    def report(self, elapsed):
+        done = len(self.durations)
+        self.stdout.write(f'Запросов: {done}, ошибок: {self.errors}')
+        self.stdout.write(f'Статусы: {self.statuses}')
+        if not done:
+            return
+        self.stdout.write(
+            f'{done / elapsed:.0f} запросов в секунду, '
+            f'p50 {percentile(self.durations, 50):.1f} мс, '
+            f'p95 {percentile(self.durations, 95):.1f} мс'
+        )
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.images import (
+    get_pool,
+    make_variants,
+    save_variants,
+    variants_ready
+)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаем уменьшенные копии и WebP для изображений рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать уже готовые варианты'
+        )
+
+    def handle(self, *args, **options):
+        names = [
+            name for name, image_variants in Recipe.objects.exclude(
+                image=''
+            ).values_list('image', 'image_variants').iterator()
+            if options['force'] or not variants_ready(name, image_variants)
+        ]
+        pool = get_pool()
+        futures = [
+            pool.submit(
+                make_variants, name, settings.MEDIA_ROOT,
+                settings.RECIPE_THUMBNAIL_SIZES
+            )
+            for name in names
+        ]
+        failed = 0
+        for future in futures:
+            try:
+                save_variants(*future.result())
+            except Exception as error:
+                failed += 1
+                self.stderr.write(str(error))
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {len(names) - failed}, '
+            f'ошибок: {failed}'
+        ))
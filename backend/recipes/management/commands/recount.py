@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingList
+
+User = get_user_model()
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Пересчитываем денормализованные счетчики'
+
+    COUNTERS = (
+        (Recipe, 'favorites_count', Favorite, 'recipe'),
+        (Recipe, 'shopping_cart_count', ShoppingList, 'recipe'),
+        (User, 'recipes_count', Recipe, 'author'),
+    )
+
+    @transaction.atomic
+    def handle(self, *args, **kwargs):
+        for model, field, source, source_field in self.COUNTERS:
+            actual = count_subquery(source, source_field)
+            drifted = model.objects.annotate(actual=actual).exclude(
+                **{field: F('actual')}
+            ).values('pk')
+            fixed = model.objects.filter(pk__in=drifted).update(
+                **{field: actual}
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{model.__name__}.{field}: исправлено {fixed}'
+                )
+            )
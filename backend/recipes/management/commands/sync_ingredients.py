@@ -0,0 +1,163 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import INGREDIENT_CATALOG_VERSION, bump_version
+from recipes.models import Ingredient, IngredientInRecipe
+
+NAME_MAX_LENGTH = Ingredient._meta.get_field('name').max_length
+UNIT_MAX_LENGTH = Ingredient._meta.get_field('measurement_unit').max_length
+CHUNK_SIZE = 64 * 1024
+SEPARATORS = '[,] \r\n\t'
+
+
+def iter_csv(file):
+    reader = csv.reader(file)
+    for row in reader:
+        if row == ['name', 'measurement_unit']:
+            continue
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def iter_json(file):
+    """Потоково читает JSON-массив объектов или NDJSON."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    while True:
+        chunk = file.read(CHUNK_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while (position < len(buffer)
+                   and buffer[position] in SEPARATORS):
+                position += 1
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                break
+            position = end
+            yield item['name'], item['measurement_unit']
+        if not chunk:
+            if buffer[position:].strip():
+                raise CommandError('Некорректный JSON в конце файла')
+            return
+
+
+class Command(BaseCommand):
+    help = 'Синхронизируем справочник ингредиентов с CSV или JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            default=os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv')
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--delete', action='store_true',
+            help='Удалить ингредиенты, которых нет в файле '
+                 'и которые не используются в рецептах'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать изменения'
+        )
+
+    def read_catalog(self, path):
+        reader = iter_json if path.endswith(('.json', '.ndjson')) else iter_csv
+        catalog = {}
+        try:
+            with open(path, encoding='utf-8') as file:
+                for name, measurement_unit in reader(file):
+                    name = name.strip()
+                    measurement_unit = measurement_unit.strip()
+                    if (not name or len(name) > NAME_MAX_LENGTH
+                            or len(measurement_unit) > UNIT_MAX_LENGTH):
+                        self.stderr.write(f'Пропущена строка: {name}')
+                        continue
+                    catalog[name] = measurement_unit
+        except FileNotFoundError:
+            raise CommandError(f'Файл {path} не найден')
+        return catalog
+
+    def diff(self, catalog, delete):
+        existing = {
+            name: (pk, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        }
+        inserts = [
+            Ingredient(name=name, measurement_unit=measurement_unit)
+            for name, measurement_unit in catalog.items()
+            if name not in existing
+        ]
+        updates = [
+            Ingredient(
+                id=existing[name][0], name=name, measurement_unit=unit
+            )
+            for name, unit in catalog.items()
+            if name in existing and existing[name][1] != unit
+        ]
+        deletions = {}
+        if delete:
+            used = set(
+                IngredientInRecipe.objects.values_list(
+                    'ingredient_id', flat=True
+                ).distinct()
+            )
+            deletions = {
+                pk: name for name, (pk, _) in existing.items()
+                if name not in catalog and pk not in used
+            }
+        return inserts, updates, deletions
+
+    def batches(self, items, batch_size):
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    @transaction.atomic
+    def apply(self, inserts, updates, deletions, batch_size):
+        Ingredient.objects.bulk_create(
+            inserts, batch_size=batch_size, ignore_conflicts=True
+        )
+        Ingredient.objects.bulk_update(
+            updates, ['measurement_unit'], batch_size=batch_size
+        )
+        for batch in self.batches(deletions, batch_size):
+            Ingredient.objects.filter(id__in=batch).delete()
+        transaction.on_commit(
+            lambda: bump_version(INGREDIENT_CATALOG_VERSION)
+        )
+
+    def handle(self, *args, **options):
+        catalog = self.read_catalog(options['path'])
+        inserts, updates, deletions = self.diff(catalog, options['delete'])
+        self.stdout.write(
+            f'В файле: {len(catalog)}, новых: {len(inserts)}, '
+            f'изменены единицы: {len(updates)}, '
+            f'к удалению: {len(deletions)}'
+        )
+        if options['dry_run']:
+            for ingredient in inserts:
+                self.stdout.write(f'+ {ingredient.name}')
+            for ingredient in updates:
+                self.stdout.write(
+                    f'~ {ingredient.name}: {ingredient.measurement_unit}'
+                )
+            for name in sorted(deletions.values()):
+                self.stdout.write(f'- {name}')
+            return
+        if inserts or updates or deletions:
+            self.apply(inserts, updates, deletions, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Ингредиенты синхронизированы'))
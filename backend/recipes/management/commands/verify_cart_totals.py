@@ -0,0 +1,71 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.cart import compute_totals
+from recipes.models import ShoppingCartTotal
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяем итоги списков покупок с пересчитанными заново '
+        'и при необходимости исправляем их'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Привести таблицу итогов к пересчитанным значениям'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def diff(self):
+        expected = compute_totals()
+        actual = {
+            (user_id, ingredient_id): (pk, amount)
+            for pk, user_id, ingredient_id, amount in (
+                ShoppingCartTotal.objects.values_list(
+                    'id', 'user_id', 'ingredient_id', 'amount'
+                ).iterator()
+            )
+        }
+        missing = [
+            ShoppingCartTotal(
+                user_id=user_id, ingredient_id=ingredient_id, amount=amount
+            )
+            for (user_id, ingredient_id), amount in expected.items()
+            if (user_id, ingredient_id) not in actual
+        ]
+        wrong = [
+            ShoppingCartTotal(id=pk, amount=expected[key])
+            for key, (pk, amount) in actual.items()
+            if key in expected and expected[key] != amount
+        ]
+        extra = [
+            pk for key, (pk, _) in actual.items() if key not in expected
+        ]
+        return missing, wrong, extra
+
+    @transaction.atomic
+    def fix(self, missing, wrong, extra, batch_size):
+        ShoppingCartTotal.objects.bulk_create(missing, batch_size=batch_size)
+        ShoppingCartTotal.objects.bulk_update(
+            wrong, ['amount'], batch_size=batch_size
+        )
+        for start in range(0, len(extra), batch_size):
+            ShoppingCartTotal.objects.filter(
+                id__in=extra[start:start + batch_size]
+            ).delete()
+
+    def handle(self, *args, **options):
+        missing, wrong, extra = self.diff()
+        self.stdout.write(
+            f'Нет строк: {len(missing)}, неверное количество: {len(wrong)}, '
+            f'лишних строк: {len(extra)}'
+        )
+        if not (missing or wrong or extra):
+            self.stdout.write(self.style.SUCCESS('Итоги совпадают'))
+            return
+        if not options['fix']:
+            raise CommandError('Итоги расходятся с пересчитанными')
+        self.fix(missing, wrong, extra, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Итоги исправлены'))
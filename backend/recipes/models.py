@@ -1,5 +1,6 @@
 from colorfield.fields import ColorField
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
@@ -68,7 +69,7 @@ class IngredientInRecipe(models.Model):
         'Recipe',
         on_delete=models.CASCADE,
         verbose_name='Рецепт',
-        related_name='+'
+        related_name='recipe_ingredients'
     )
     ingredient = models.ForeignKey(
         Ingredient,
@@ -138,9 +139,11 @@ class Recipe(models.Model):
         auto_now_add=True
     )
     ingredients = models.ManyToManyField(
-        IngredientInRecipe,
-        related_name='recipe',
-        null=False,
+        Ingredient,
+        through=IngredientInRecipe,
+        through_fields=('recipe_parent', 'ingredient'),
+        verbose_name='Ингредиенты',
+        related_name='recipes',
         blank=True
     )
     cooking_time = models.PositiveSmallIntegerField(
@@ -155,11 +158,39 @@ class Recipe(models.Model):
             "Не может быть меньше минуты!"
         ),
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0,
+        editable=False,
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в список покупок',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+    image_variants = models.JSONField(
+        verbose_name='Готовые варианты изображения',
+        default=dict,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            # Лента: сортировка страниц и курсора, в том числе по автору.
+            models.Index(fields=['-pub_date', 'id'], name='recipe_feed_idx'),
+            models.Index(
+                fields=['author', '-pub_date', 'id'],
+                name='recipe_author_feed_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -221,3 +252,36 @@ class ShoppingList(models.Model):
 
     def __str__(self):
         return f'{self.user} {self.recipe}'
+
+
+class ShoppingCartTotal(models.Model):
+    """
+    Суммарное количество ингредиента в списке покупок пользователя.
+    Поддерживается при изменении списка покупок и рецептов в нем.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_totals',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент',
+    )
+    amount = models.IntegerField(verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Итог списка покупок'
+        verbose_name_plural = 'Итоги списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'], name='unique_cart_total'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient}: {self.amount}'
@@ -0,0 +1,156 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector
+)
+from django.db import connections
+from django.db.models import (
+    Aggregate,
+    F,
+    FloatField,
+    OuterRef,
+    Subquery,
+    TextField,
+    Value
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+from .models import IngredientInRecipe, Recipe
+
+SEARCH_CONFIG = 'russian'
+SEARCH_INDEX_NAME = 'recipes_recipe_search_vector_gin'
+FTS_TABLE = 'recipes_recipe_fts'
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+class GroupConcat(Aggregate):
+    """Аналог StringAgg для SQLite."""
+
+    function = 'GROUP_CONCAT'
+    output_field = TextField()
+
+    def __init__(self, expression, delimiter, **extra):
+        super().__init__(expression, Value(delimiter), **extra)
+
+
+def ingredient_names(outer_ref, aggregate):
+    """Подзапрос с названиями ингредиентов рецепта одной строкой."""
+    return Coalesce(
+        Subquery(
+            IngredientInRecipe.objects.filter(
+                recipe_parent=outer_ref
+            ).order_by().values('recipe_parent').annotate(
+                names=aggregate('ingredient__name', ' ')
+            ).values('names')
+        ),
+        Value(''),
+        output_field=TextField(),
+    )
+
+
+def create_search_index(using):
+    """
+    Создает GIN-индекс по search_vector в PostgreSQL или теневую таблицу
+    FTS5 в SQLite и заполняет поисковые данные для новых рецептов.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {SEARCH_INDEX_NAME} '
+                f'ON {Recipe._meta.db_table} USING gin (search_vector)'
+            )
+            recipe_ids = Recipe.objects.using(using).filter(
+                search_vector__isnull=True
+            ).values_list('id', flat=True)
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                'USING fts5(name, text, ingredients)'
+            )
+            recipe_ids = Recipe.objects.using(using).exclude(
+                id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE}', ())
+            ).values_list('id', flat=True)
+        else:
+            return
+    update_search_index(list(recipe_ids), using=using)
+
+
+def update_search_index(recipe_ids, using='default'):
+    """Пересчитывает поисковые данные рецептов."""
+    if not recipe_ids:
+        return
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        Recipe.objects.using(using).filter(id__in=recipe_ids).update(
+            search_vector=(
+                SearchVector('name', weight='A', config=SEARCH_CONFIG)
+                + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+                + SearchVector(
+                    ingredient_names(OuterRef('pk'), StringAgg),
+                    weight='C',
+                    config=SEARCH_CONFIG,
+                )
+            )
+        )
+    elif connection.vendor == 'sqlite':
+        rows = Recipe.objects.using(using).filter(
+            id__in=recipe_ids
+        ).annotate(
+            ingredient_names=ingredient_names(OuterRef('pk'), GroupConcat)
+        ).values_list('id', 'name', 'text', 'ingredient_names')
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(recipe_id,) for recipe_id in recipe_ids]
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, text, ingredients) '
+                'VALUES (%s, %s, %s, %s)',
+                list(rows)
+            )
+
+
+def fts_query(value):
+    """Превращает пользовательский ввод в безопасный запрос FTS5."""
+    terms = value.split()
+    return ' '.join(
+        '"{}"*'.format(term.replace('"', '""')) for term in terms
+    )
+
+
+def search_recipes(queryset, value):
+    """
+    Фильтрует рецепты по полнотекстовому запросу и сортирует по
+    релевантности (аннотация search_rank, больше - лучше).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(
+            value, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+    elif connection.vendor == 'sqlite':
+        match = fts_query(value)
+        if not match:
+            return queryset
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        queryset = queryset.filter(
+            id__in=RawSQL(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                (match,)
+            )
+        ).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = {Recipe._meta.db_table}.id',
+            (match,),
+            output_field=FloatField(),
+        ))
+    else:
+        return queryset.filter(name__icontains=value)
+    return queryset.order_by('-search_rank', '-pub_date')
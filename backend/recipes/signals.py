@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cart
+from .models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingList
+)
+from .images import schedule_variants
+from .search import update_search_index
+
+User = get_user_model()
+
+
+def increment(model, pk, field):
+    model.objects.filter(pk=pk).update(**{field: F(field) + 1})
+
+
+def decrement(model, pk, field):
+    model.objects.filter(pk=pk, **{f'{field}__gt': 0}).update(
+        **{field: F(field) - 1}
+    )
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(instance, created, **kwargs):
+    if created:
+        increment(Recipe, instance.recipe_id, 'favorites_count')
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(instance, **kwargs):
+    decrement(Recipe, instance.recipe_id, 'favorites_count')
+
+
+@receiver(post_save, sender=ShoppingList)
+def shopping_list_created(instance, created, using, **kwargs):
+    if created:
+        increment(Recipe, instance.recipe_id, 'shopping_cart_count')
+        cart.add_recipe(instance.user_id, instance.recipe_id, using)
+
+
+@receiver(post_delete, sender=ShoppingList)
+def shopping_list_deleted(instance, using, **kwargs):
+    decrement(Recipe, instance.recipe_id, 'shopping_cart_count')
+    cart.remove_recipe(instance.user_id, instance.recipe_id, using)
+
+
+@receiver(pre_save, sender=IngredientInRecipe)
+def recipe_ingredient_saving(instance, using, **kwargs):
+    """Запоминает прежнюю строку, чтобы перенести разницу в корзины."""
+    instance.previous = None
+    if instance.pk is not None:
+        instance.previous = IngredientInRecipe.objects.using(using).filter(
+            pk=instance.pk
+        ).values_list('ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+def recipe_ingredient_saved(instance, using, **kwargs):
+    deltas = {instance.ingredient_id: instance.amount}
+    if getattr(instance, 'previous', None) is not None:
+        ingredient_id, amount = instance.previous
+        deltas[ingredient_id] = deltas.get(ingredient_id, 0) - amount
+    cart.apply_recipe_deltas(instance.recipe_parent_id, deltas, using)
+
+
+@receiver(post_delete, sender=IngredientInRecipe)
+def recipe_ingredient_deleted(instance, using, **kwargs):
+    cart.apply_recipe_deltas(
+        instance.recipe_parent_id,
+        {instance.ingredient_id: -instance.amount},
+        using,
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(instance, created, **kwargs):
+    if created:
+        increment(User, instance.author_id, 'recipes_count')
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    decrement(User, instance.author_id, 'recipes_count')
+
+
+class PendingSearchUpdate:
+    """Рецепты, изменившиеся за транзакцию; индексируются одним проходом."""
+
+    def __init__(self, using):
+        self.using = using
+        self.recipe_ids = set()
+
+    def __call__(self):
+        update_search_index(sorted(self.recipe_ids), using=self.using)
+
+
+def schedule_search_update(recipe_ids, using):
+    connection = transaction.get_connection(using)
+    pending = getattr(connection, 'pending_search_update', None)
+    if pending is not None and any(
+        callback is pending for _, callback in connection.run_on_commit
+    ):
+        pending.recipe_ids.update(recipe_ids)
+        return
+    pending = connection.pending_search_update = PendingSearchUpdate(using)
+    pending.recipe_ids.update(recipe_ids)
+    transaction.on_commit(pending, using=using)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, using, **kwargs):
+    schedule_search_update([instance.pk], using)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(instance, **kwargs):
+    transaction.on_commit(lambda: schedule_variants(instance))
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def recipe_ingredient_changed(instance, using, **kwargs):
+    schedule_search_update([instance.recipe_parent_id], using)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(instance, created, using, **kwargs):
+    if created:
+        return
+    schedule_search_update(
+        list(IngredientInRecipe.objects.using(using).filter(
+            ingredient=instance
+        ).values_list('recipe_parent_id', flat=True)),
+        using
+    )
@@ -0,0 +1,91 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.management.commands.benchmark_api import (
+    BENCHMARK_CACHES,
+    Command
+)
+from recipes.models import Tag
+from users.models import User
+
+
+def make_command(**options):
+    command = Command()
+    command.options = {
+        'warmup': 0, 'iterations': 2, 'tolerance': 0.25,
+        'min_delta_ms': 2.0, **options,
+    }
+    return command
+
+
+class MeasureTest(TestCase):
+
+    def test_queries_are_counted(self):
+        Tag.objects.create(name='Завтрак', slug='breakfast', color='#E26C2D')
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(
+            email='cook@example.com', username='cook', password='secret',
+            first_name='Иван', last_name='Иванов',
+        ))
+        result = make_command().measure(
+            lambda: client.get('/api/recipes/')
+        )
+        self.assertEqual(result['status'], 200)
+        self.assertGreater(result['queries'], 0)
+
+
+class CompareTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = Path(directory.name) / 'benchmark.json'
+        self.baseline.write_text(json.dumps({
+            'recipes': {
+                'status': 200, 'p50_ms': 10, 'p95_ms': 12,
+                'queries': 4, 'peak_kb': 100,
+            },
+        }))
+        self.command = make_command(baseline=str(self.baseline))
+
+    def result(self, **changes):
+        return {'recipes': {
+            'status': 200, 'p50_ms': 10, 'p95_ms': 12,
+            'queries': 4, 'peak_kb': 100, **changes,
+        }}
+
+    def test_within_budget(self):
+        self.command.compare(self.result())
+
+    def test_query_budget_exceeded(self):
+        with self.assertRaisesMessage(CommandError, 'запросов 5 вместо 4'):
+            self.command.compare(self.result(queries=5))
+
+
+class IsolationTest(TestCase):
+
+    def test_private_cache(self):
+        def run_cases(command):
+            self.assertEqual(settings.CACHES, BENCHMARK_CACHES)
+            self.assertEqual(settings.REPLICA_DATABASES, [])
+            cache.set('benchmark_probe', 1)
+            return {}
+
+        cache.clear()
+        with mock.patch.object(connection.creation, 'create_test_db'), \
+                mock.patch.object(connection.creation, 'destroy_test_db'), \
+                mock.patch.object(Command, 'build_dataset'), \
+                mock.patch.object(Command, 'run_cases', run_cases), \
+                mock.patch.object(Command, 'compare'):
+            call_command('benchmark_api', stdout=StringIO())
+        self.assertIsNone(cache.get('benchmark_probe'))
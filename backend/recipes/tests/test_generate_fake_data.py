@@ -0,0 +1,65 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from recipes.management.commands.generate_fake_data import copy_value
+from recipes.models import Favorite, IngredientInRecipe, Recipe
+from users.models import Follow, User
+
+TABLES = [
+    model._meta.db_table
+    for model in (Recipe, IngredientInRecipe, Favorite, Follow)
+]
+
+
+def get_indexes():
+    with connection.cursor() as cursor:
+        return {
+            table: connection.introspection.get_constraints(cursor, table)
+            for table in TABLES
+        }
+
+
+class GenerateFakeDataTest(TestCase):
+    """В PostgreSQL строки загружаются через COPY, в SQLite - bulk_create."""
+
+    def generate(self, *options):
+        call_command(
+            'generate_fake_data', '--users', '20', '--recipes', '50',
+            '--recipe-ingredients', '200', '--favorites', '100',
+            '--shopping-lists', '50', '--follows', '50',
+            '--ingredients', '30', '--chunk-size', '16', *options,
+            stdout=StringIO(),
+        )
+
+    def test_loads_rows(self):
+        self.generate()
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Recipe.objects.count(), 50)
+        self.assertEqual(IngredientInRecipe.objects.count(), 200)
+        recipe = Recipe.objects.first()
+        self.assertEqual(recipe.image_variants, {})
+        self.assertEqual(
+            recipe.favorites_count,
+            Favorite.objects.filter(recipe=recipe).count(),
+        )
+
+    def test_restores_deferred_indexes(self):
+        indexes = get_indexes()
+        self.generate('--defer-indexes', '--defer-constraints')
+        self.assertEqual(get_indexes(), indexes)
+        self.assertEqual(Recipe.objects.count(), 50)
+
+
+class CopyValueTest(SimpleTestCase):
+
+    def test_escapes_text(self):
+        self.assertEqual(copy_value('а\tб\nв\\'), 'а\\tб\\nв\\\\')
+        self.assertEqual(copy_value(None), '\\N')
+
+    def test_json(self):
+        self.assertEqual(
+            copy_value({'thumb': 'a\tb.webp'}), '{"thumb": "a\\\\tb.webp"}'
+        )
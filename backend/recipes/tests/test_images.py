@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from recipes.images import image_urls, variant_name
+from recipes.models import Recipe
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageVariantsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='cook@example.com', username='cook', password='secret',
+            first_name='Иван', last_name='Иванов',
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                name=f'Рецепт {extension}', text='Текст', cooking_time=10,
+                image=f'recipes/images/dish.{extension}', author=author,
+            )
+            for extension in ('png', 'jpg')
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        os.makedirs(os.path.join(MEDIA_ROOT, 'recipes/images'), exist_ok=True)
+        for recipe in self.recipes:
+            Image.new('RGB', (800, 600)).save(
+                os.path.join(MEDIA_ROOT, recipe.image.name)
+            )
+
+    def test_same_stem_different_extension(self):
+        self.assertNotEqual(
+            variant_name('recipes/images/dish.png', 'small', 'jpg'),
+            variant_name('recipes/images/dish.jpg', 'small', 'jpg'),
+        )
+
+    def test_originals_until_variants_recorded(self):
+        urls = image_urls(self.recipes[0])
+        for size in settings.RECIPE_THUMBNAIL_SIZES:
+            self.assertEqual(urls[size], urls['original'])
+
+    def test_command_records_variants(self):
+        call_command('make_thumbnails', stdout=StringIO())
+        for recipe in self.recipes:
+            recipe.refresh_from_db()
+            self.assertEqual(
+                recipe.image_variants,
+                {recipe.image.name: list(settings.RECIPE_THUMBNAIL_SIZES)},
+            )
+            with mock.patch(
+                'django.core.files.storage.FileSystemStorage.exists'
+            ) as exists:
+                urls = image_urls(recipe)
+            exists.assert_not_called()
+            for size in settings.RECIPE_THUMBNAIL_SIZES:
+                name = variant_name(recipe.image.name, size, 'jpg')
+                self.assertEqual(urls[size], f'{settings.MEDIA_URL}{name}')
+                self.assertTrue(os.path.exists(os.path.join(MEDIA_ROOT, name)))
+
+    def test_image_change_resets_variants(self):
+        recipe = self.recipes[0]
+        call_command('make_thumbnails', stdout=StringIO())
+        recipe.refresh_from_db()
+        recipe.image = 'recipes/images/other.png'
+        urls = image_urls(recipe)
+        self.assertEqual(urls['small'], urls['original'])
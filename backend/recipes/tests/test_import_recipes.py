@@ -0,0 +1,150 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from users.models import User
+
+
+def record(**fields):
+    return {
+        'name': 'Борщ', 'text': 'Варить два часа', 'cooking_time': 120,
+        'author': 'cook@example.com', 'tags': ['lunch'],
+        'ingredients': [{'name': 'свекла', 'amount': 300}],
+        **fields,
+    }
+
+
+class ImportTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='cook@example.com', username='cook', password='secret',
+            first_name='Иван', last_name='Иванов',
+        )
+        Tag.objects.create(name='Обед', slug='lunch', color='#49B64E')
+        for name in ('свекла', 'капуста'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+
+class ImportRecipesTest(ImportTestCase):
+
+    def run_import(self, *lines):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / 'recipes.ndjson'
+        path.write_text('\n'.join(
+            line if isinstance(line, str) else json.dumps(line)
+            for line in lines
+        ), encoding='utf-8')
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_recipes', str(path), stdout=stdout,
+                     stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_duplicate_ingredients_are_merged(self):
+        self.run_import(record(
+            tags=['lunch', 'lunch'],
+            ingredients=[
+                {'name': 'свекла', 'amount': 300},
+                {'name': 'капуста', 'amount': 200},
+                {'name': 'свекла', 'amount': 100},
+            ],
+        ))
+        recipe = Recipe.objects.get(name='Борщ')
+        self.assertEqual(
+            dict(IngredientInRecipe.objects.filter(
+                recipe_parent=recipe
+            ).values_list('ingredient__name', 'amount')),
+            {'свекла': 400, 'капуста': 200},
+        )
+        self.assertEqual(recipe.tags.count(), 1)
+
+    def test_invalid_records_are_skipped_and_reported(self):
+        invalid = {
+            'text': record(name='Без описания', text=None),
+            'cooking_time': {
+                key: value for key, value in record(name='Без времени').items()
+                if key != 'cooking_time'
+            },
+            'amount': record(
+                name='Без количества', ingredients=[{'name': 'свекла'}]
+            ),
+            'pub_date': record(name='С датой', pub_date='вчера'),
+            'author': record(name='Без автора', author='nobody@example.com'),
+            'ingredient': record(
+                name='С неизвестным',
+                ingredients=[{'name': 'морковь', 'amount': 1}],
+            ),
+        }
+        stdout, stderr = self.run_import(
+            '{не json', ['список'], *invalid.values(), record(),
+        )
+        self.assertEqual(
+            list(Recipe.objects.values_list('name', flat=True)), ['Борщ']
+        )
+        self.assertIn('пропущено записей: 8', stdout)
+        lines = stderr.splitlines()
+        self.assertEqual(len(lines), 8)
+        self.assertTrue(lines[0].startswith('Строка 1: некорректный JSON'))
+        for line, field in zip(lines[2:], ('text', 'cooking_time', 'amount',
+                                           'pub_date')):
+            self.assertIn(field, line)
+        self.assertIn('нет автора', lines[6])
+        self.assertIn('морковь', lines[7])
+
+
+class ImportImagesTest(ImportTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        (self.root / 'images').mkdir()
+        Image.new('RGB', (8, 8)).save(self.root / 'images' / 'borsch.png')
+        (self.root / 'recipes.ndjson').write_text(
+            json.dumps(record(image='borsch.png')), encoding='utf-8'
+        )
+        media = override_settings(MEDIA_ROOT=str(self.root / 'media'))
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def run_import(self):
+        call_command(
+            'import_recipes', str(self.root / 'recipes.ndjson'),
+            '--images-dir', str(self.root / 'images'),
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+    def test_rolled_back_batch_deletes_images(self):
+        with mock.patch(
+            'recipes.management.commands.import_recipes.update_search_index',
+            side_effect=RuntimeError,
+        ), self.assertRaises(RuntimeError):
+            self.run_import()
+        self.assertFalse(Recipe.objects.exists())
+        self.assertEqual(
+            os.listdir(self.root / 'media'), [], 'остались файлы'
+        )
+
+    def test_variants_scheduled_after_commit(self):
+        with mock.patch(
+            'recipes.management.commands.import_recipes.schedule_variants'
+        ) as schedule:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.run_import()
+            schedule.assert_not_called()
+            for callback in callbacks:
+                callback()
+        recipe = Recipe.objects.get()
+        schedule.assert_called_once_with(recipe)
+        self.assertTrue(default_storage.exists(recipe.image.name))
@@ -0,0 +1,66 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe
+from users.models import User
+
+
+class SyncIngredientsDryRunTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('соль', 'перец', 'укроп', 'мука'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+        recipe = Recipe.objects.create(
+            name='Блины', text='Текст', cooking_time=20,
+            image='recipes/images/recipe.png',
+            author=User.objects.create_user(
+                email='cook@example.com', username='cook',
+                password='secret', first_name='Иван', last_name='Иванов',
+            ),
+        )
+        IngredientInRecipe.objects.create(
+            recipe_parent=recipe, amount=200,
+            ingredient=Ingredient.objects.get(name='мука'),
+        )
+
+    def sync(self, *options, rows='соль,г\n'):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / 'ingredients.csv'
+        path.write_text(rows, encoding='utf-8')
+        out = StringIO()
+        call_command(
+            'sync_ingredients', str(path), '--delete', *options, stdout=out
+        )
+        return out
+
+    def test_lists_deleted_names(self):
+        out = self.sync('--dry-run')
+        lines = out.getvalue().splitlines()
+        self.assertIn('к удалению: 2', lines[0])
+        self.assertEqual(lines[1:], ['- перец', '- укроп'])
+        self.assertEqual(Ingredient.objects.count(), 4)
+
+    def test_deletes_unused(self):
+        self.sync()
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', flat=True)),
+            {'соль', 'мука'},
+        )
+
+    def test_lists_every_change(self):
+        rows = ''.join(f'специя {number},г\n' for number in range(12))
+        out = self.sync('--dry-run', rows=rows + 'соль,кг\nмука,г\n')
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 1 + 12 + 1 + 2)
+        self.assertEqual(
+            sorted(line for line in lines if line.startswith('+ ')),
+            sorted(f'+ специя {number}' for number in range(12)),
+        )
+        self.assertIn('~ соль: кг', lines)
+        self.assertEqual(Ingredient.objects.count(), 4)
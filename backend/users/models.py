@@ -35,6 +35,11 @@ class User(AbstractUser):
         max_length=settings.NAME_MAX_LENGTH,
         verbose_name='Фамилия',
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False,
+    )
     subscribe = models.ManyToManyField(
         'self', through='Follow', symmetrical=False,
         through_fields=('user', 'author')